@@ -1,11 +1,23 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from pipeline import processar_e_prever
+from pipeline import memoria_resultado, processar_e_prever
+from artefatos import obter_registro
+from cache_resultados import CacheResultados, chave_resultado
+from explicacoes import AQUECER, ProvedorExplicacoes
+from indice_koi import IndiceKOI
+from leitores import EXTENSOES, formato_do_arquivo, ler_tabela
+from instrumentacao import ATIVA as INSTRUMENTACAO_ATIVA, coletar, estagio
+from renderizacao import PRE_RENDERIZAR, CacheRenderizacoes, renderizar_explicacao
+from resumo_analise import ResumoAnalise
+from tabela_resultados import (TAMANHOS_PAGINA, exportar_csv, exportar_parquet, filtrar_resultados,
+                               numero_de_paginas, ordenar_posicoes, pagina_resultados)
+import time
 import os
-import shap
-import matplotlib.pyplot as plt
+import json
+from functools import partial
 import numpy as np
+from io import BytesIO
 
 st.set_page_config(
     page_title="Celestium: Exoplanet Classifier",
@@ -26,13 +38,47 @@ if current_theme == "dark":
         icon="💡"
     )
 
+@st.cache_resource
+def carregar_registro():
+    # Um único registro por processo, compartilhado por todas as sessões.
+    return obter_registro().carregar_essenciais()
+
+@st.cache_resource
+def carregar_cache_resultados():
+    # Compartilhado entre sessões; defina EXOPLANETAS_CACHE_DIR para manter os resultados também em disco.
+    return CacheResultados(diretorio=os.environ.get('EXOPLANETAS_CACHE_DIR'))
+
+@st.cache_resource
+def carregar_cache_renderizacoes():
+    # As chaves incluem o hash da análise, então as sessões podem compartilhar as figuras.
+    return CacheRenderizacoes()
+
+def graficos_desatualizados():
+    # atualizar_artefatos.py marca nas métricas que os gráficos são do modelo anterior.
+    try:
+        with open('metricas_modelo.json', 'r') as f:
+            return json.load(f).get('graficos_desatualizados', False)
+    except (OSError, ValueError):
+        return False
+
+def memoria_sessao():
+    # Bytes que a análise ocupa nesta sessão; o cache de resultados e o de figuras são compartilhados e ficam de fora.
+    memoria = memoria_resultado(st.session_state.df_resultados, st.session_state.explicacoes)
+    for nome in ('resumo', 'indice_koi'):
+        if st.session_state.get(nome) is not None:
+            memoria[nome] = st.session_state[nome].nbytes
+    memoria['total'] = sum(memoria.values())
+    return memoria
+
 if 'analysis_complete' not in st.session_state:
     st.session_state.analysis_complete = False
     st.session_state.df_resultados = pd.DataFrame()
     st.session_state.avisos = []
-    st.session_state.shap_values = None
-    st.session_state.X_final = None
-    st.session_state.explainer = None
+    st.session_state.explicacoes = None
+    st.session_state.id_analise = None
+    st.session_state.resumo = None
+    st.session_state.indice_koi = None
+    st.session_state.medicoes = []
     
 st.markdown("""
 <style>
@@ -157,8 +203,39 @@ def run_analysis():
         try:
             if 'objeto_selecionado' in st.session_state:
                 del st.session_state['objeto_selecionado']
-            df_bruto = pd.read_csv(st.session_state.uploaded_file)
-            st.session_state.df_resultados, st.session_state.avisos, st.session_state.shap_values, st.session_state.X_final, st.session_state.explainer = processar_e_prever(df_bruto)
+            with coletar() as medicoes, estagio('run_analysis') as total:
+                registro = carregar_registro()
+                cache = carregar_cache_resultados()
+                conteudo = st.session_state.uploaded_file.getvalue()
+                formato = formato_do_arquivo(st.session_state.uploaded_file.name)
+                with estagio('cache_resultados'):
+                    chave = chave_resultado(conteudo, registro.impressao_digital(), formato)
+                    resultado = cache.obter(chave)
+                if resultado is None:
+                    inicio = time.perf_counter()
+                    with estagio('leitura_arquivo') as leitura:
+                        # Só kepoi_name e as colunas do modelo são lidas, já como float64.
+                        df_bruto = ler_tabela(conteudo, registro.colunas_modelo, formato)
+                        leitura.linhas = len(df_bruto)
+                    df_resultados, avisos, explicacoes = processar_e_prever(df_bruto, registro=registro)
+                    # Só o que é imutável vai para o cache compartilhado; o provedor de explicações
+                    # (cache LRU e aquecimento) é de cada sessão.
+                    resultado = (df_resultados, avisos, explicacoes.X_final)
+                    cache.guardar(chave, resultado, time.perf_counter() - inicio)
+                if st.session_state.get('explicacoes') is not None:
+                    st.session_state.explicacoes.parar_aquecimento()
+                st.session_state.df_resultados, st.session_state.avisos, X_final = resultado
+                st.session_state.explicacoes = ProvedorExplicacoes(X_final, partial(registro.obter, 'explainer'))
+                st.session_state.id_analise = chave
+                total.linhas = len(st.session_state.df_resultados)
+                with estagio('agregados', total.linhas):
+                    st.session_state.resumo = ResumoAnalise(st.session_state.df_resultados)
+                    st.session_state.indice_koi = IndiceKOI(st.session_state.df_resultados)
+                if AQUECER:
+                    st.session_state.explicacoes.aquecer(st.session_state.indice_koi.posicoes_limitrofes(AQUECER))
+                if PRE_RENDERIZAR:
+                    carregar_cache_renderizacoes().pre_renderizar(chave, st.session_state.explicacoes, st.session_state.df_resultados, st.session_state.indice_koi)
+            st.session_state.medicoes = medicoes
             st.session_state.analysis_complete = True
         except Exception as e:
             st.error(f"An error occurred during analysis: {e}")
@@ -168,16 +245,15 @@ with st.sidebar:
     st.title("Discovering New Worlds with AI")
     st.markdown("""
     <div style='font-size: small; color: #FFFFFF; opacity: 0.8;'>
-    Required Format: The CSV file must follow the data scheme of NASA's Kepler Objects of Interest (KOI) database.
+    Required Format: The file (CSV, Parquet, Feather or Arrow) must follow the data scheme of NASA's Kepler Objects of Interest (KOI) database.
     </div>
     """, unsafe_allow_html=True)
-    st.file_uploader("Upload a CSV file:", type="csv", key='uploaded_file')
+    st.file_uploader("Upload a KOI file:", type=[extensao.lstrip('.') for extensao in EXTENSOES], key='uploaded_file')
     st.button("Analyze Candidates", use_container_width=True, type="primary", disabled=not st.session_state.get('uploaded_file'), on_click=run_analysis)
     st.markdown("---")
 
 import base64
 from PIL import Image
-from io import BytesIO
 
 def get_base64_image(image_path):
     img = Image.open(image_path)
@@ -211,9 +287,13 @@ st.markdown("Upload planetary transit data (Kepler Objects of Interest) to class
 if st.session_state.get('analysis_complete'):
     df_resultados = st.session_state.df_resultados
     avisos = st.session_state.avisos
-    shap_values = st.session_state.shap_values
-    X_final = st.session_state.X_final
-    explainer = st.session_state.explainer
+    explicacoes = st.session_state.explicacoes
+    if st.session_state.get('resumo') is None:
+        st.session_state.resumo = ResumoAnalise(df_resultados)
+    resumo = st.session_state.resumo
+    if st.session_state.get('indice_koi') is None:
+        st.session_state.indice_koi = IndiceKOI(df_resultados)
+    indice_koi = st.session_state.indice_koi
 
     if "Perfect analysis" in avisos[0]:
         st.success("Analysis successfully completed. All data was complete.")
@@ -223,6 +303,11 @@ if st.session_state.get('analysis_complete'):
             for aviso in avisos:
                 st.info(aviso)
     
+    if INSTRUMENTACAO_ATIVA and st.session_state.get('medicoes'):
+        with st.expander("Performance"):
+            # Estágios internos aparecem antes de run_analysis, que os engloba.
+            st.dataframe(pd.DataFrame(st.session_state.medicoes), use_container_width=True, hide_index=True)
+
     tab1, tab2, tab3, tab4 = st.tabs([
         "**Summary Dashboard**",
         "**Results Table**",
@@ -230,18 +315,10 @@ if st.session_state.get('analysis_complete'):
         "**About the Model**"
     ])    
     with tab1:
-        df_display_viz = df_resultados.copy()
-        mapeamento_viz = {'FALSO POSITIVO': 'FALSE POSITIVE', 'CONFIRMADO': 'CONFIRMED'}
-        df_display_viz['Prediction_EN'] = df_display_viz['Predicao'].map(mapeamento_viz)
-        
-        total = len(df_display_viz)
-        confirmados = (df_display_viz['Prediction_EN'] == 'CONFIRMED').sum()
-        falso_positivo = total - confirmados
-        
         col1, col2, col3 = st.columns(3)
-        col1.metric("Candidates Analyzed", f"{total}")
-        col2.metric("Prediction: CONFIRMED", f"{confirmados}")
-        col3.metric("Prediction: FALSE POSITIVE", f"{falso_positivo}")
+        col1.metric("Candidates Analyzed", f"{resumo.total}")
+        col2.metric("Prediction: CONFIRMED", f"{resumo.confirmados}")
+        col3.metric("Prediction: FALSE POSITIVE", f"{resumo.falsos_positivos}")
         
         st.markdown("---")
 
@@ -250,8 +327,9 @@ if st.session_state.get('analysis_complete'):
             st.subheader("Prediction Distribution")
             
             fig_pie = px.pie(
-                df_display_viz, 
-                names='Prediction_EN', 
+                names=resumo.contagens.index.astype(str),
+                values=resumo.contagens.to_numpy(),
+                color=resumo.contagens.index.astype(str),
                 color_discrete_map={'CONFIRMED':'#0B3D91', 'FALSE POSITIVE':'#B9D2EE'} 
             )
             fig_pie.update_layout(legend_title_text='')
@@ -263,24 +341,45 @@ if st.session_state.get('analysis_complete'):
         
         with col_graf2:
             st.subheader("Depth vs. Transit Duration")
-            
-            fig_scatter = px.scatter(
-                df_display_viz, 
-                x='koi_duration', 
-                y='koi_depth', 
-                color='Prediction_EN', 
-                labels={
-                    'koi_duration': 'Duration (h)',
-                    'koi_depth': 'Depth (ppm)',
-                    'Prediction_EN': 'Prediction'  
-                }, 
-                hover_name='kepoi_name', 
-                color_discrete_map={'CONFIRMED':'#0B3D91', 'FALSE POSITIVE':'#B9D2EE'}
-            )
-            fig_scatter.update_layout(legend_title_text='Prediction')
+
+            modo_densidade = resumo.amostrado and st.radio(
+                'Display', ['Sample', 'Density'], horizontal=True, key='modo_dispersao',
+                help=f"Above {resumo.orcamento_pontos} candidates the scatter shows a stratified sample of each prediction."
+            ) == 'Density'
+
+            if modo_densidade:
+                centros_duracao = (resumo.bordas_duracao[:-1] + resumo.bordas_duracao[1:]) / 2
+                centros_profundidade = (resumo.bordas_profundidade[:-1] + resumo.bordas_profundidade[1:]) / 2
+                fig_scatter = px.imshow(
+                    np.where(resumo.densidade.T > 0, resumo.densidade.T, np.nan),
+                    x=centros_duracao,
+                    y=centros_profundidade,
+                    origin='lower',
+                    aspect='auto',
+                    color_continuous_scale='Blues',
+                    labels={'x': 'Duration (h)', 'y': 'Depth (ppm)', 'color': 'Candidates'}
+                )
+            else:
+                fig_scatter = px.scatter(
+                    resumo.pontos, 
+                    x='koi_duration', 
+                    y='koi_depth', 
+                    color='Prediction_EN', 
+                    labels={
+                        'koi_duration': 'Duration (h)',
+                        'koi_depth': 'Depth (ppm)',
+                        'Prediction_EN': 'Prediction'  
+                    }, 
+                    hover_name='kepoi_name', 
+                    color_discrete_map={'CONFIRMED':'#0B3D91', 'FALSE POSITIVE':'#B9D2EE'},
+                    render_mode='webgl'
+                )
+                fig_scatter.update_layout(legend_title_text='Prediction')
 
             st.plotly_chart(fig_scatter, use_container_width=True)
             st.markdown("<div style='text-align: center; font-size: small;'>Scatter plot correlating Transit Depth (`koi_depth`) and Duration (`koi_duration`).</div>", unsafe_allow_html=True)
+            if resumo.amostrado and not modo_densidade:
+                st.caption(f"Showing a stratified sample of {len(resumo.pontos)} of {resumo.total} candidates.")
  
     with tab2:
         st.subheader("Results per Candidate")
@@ -297,126 +396,86 @@ if st.session_state.get('analysis_complete'):
             'koi_impact': 'Impact Parameter'
         }
 
-        df_display = df_resultados.copy()
-        
-        if 'Status_Dados' in df_display.columns:
-            df_display.drop(columns=['Status_Dados'], inplace=True)
-        df_display.rename(columns=rename_map, inplace=True)
+        colunas_tabela = [col for col in df_resultados.columns if col != 'Status_Dados']
+
+        fcol1, fcol2, fcol3 = st.columns(3)
+        predicoes_filtro = fcol1.multiselect('Prediction', list(df_resultados['Predicao'].cat.categories), default=list(df_resultados['Predicao'].cat.categories), key='filtro_predicao')
+        faixa_confianca = fcol2.slider('Model Confidence (%)', 0.0, 100.0, (0.0, 100.0), step=0.5, key='filtro_confianca')
+        busca_nome = fcol3.text_input('Search Object of Interest', key='filtro_nome')
+
+        scol1, scol2, scol3 = st.columns(3)
+        coluna_ordem = scol1.selectbox('Sort by', colunas_tabela, format_func=lambda col: rename_map.get(col, col), key='ordem_coluna')
+        crescente = scol2.radio('Order', ['Ascending', 'Descending'], horizontal=True, key='ordem_sentido') == 'Ascending'
+        tamanho_pagina = scol3.selectbox('Rows per page', TAMANHOS_PAGINA, index=1, key='tamanho_pagina')
+
+        # Filtro e ordenação rodam no servidor e só são refeitos quando mudam; o navegador recebe apenas a página.
+        parametros_tabela = (st.session_state.get('id_analise'), tuple(predicoes_filtro), faixa_confianca, busca_nome, coluna_ordem, crescente)
+        if st.session_state.get('ordem_tabela', (None,))[0] != parametros_tabela:
+            posicoes = filtrar_resultados(df_resultados, predicoes_filtro, *faixa_confianca, busca_nome)
+            st.session_state.ordem_tabela = (parametros_tabela, ordenar_posicoes(df_resultados, posicoes, coluna_ordem, crescente))
+        posicoes = st.session_state.ordem_tabela[1]
+
+        total_paginas = numero_de_paginas(len(posicoes), tamanho_pagina)
+        numero_pagina = min(st.number_input('Page', min_value=1, max_value=total_paginas, value=1, step=1, key='pagina_tabela'), total_paginas)
+        df_pagina = pagina_resultados(df_resultados, posicoes, numero_pagina, tamanho_pagina)[colunas_tabela].rename(columns=rename_map)
 
         st.dataframe(
-            df_display.style.set_properties(**{'text-align': 'center'})
-                           .set_table_styles([{'selector': 'th', 'props': [('text-align', 'center')]}]),
-            use_container_width=True
+            df_pagina,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                coluna: st.column_config.NumberColumn(format='%.2f', alignment='center') if coluna == 'Model Confidence (%)'
+                else st.column_config.Column(alignment='center')
+                for coluna in df_pagina.columns
+            }
         )
+        inicio_pagina = (numero_pagina - 1) * tamanho_pagina
+        st.caption(f"Showing {min(inicio_pagina + 1, len(posicoes))}–{inicio_pagina + len(df_pagina)} of {len(posicoes)} filtered candidates ({len(df_resultados)} in total).")
+
+        dcol1, dcol2 = st.columns(2)
+        # Os arquivos só são gerados quando o botão é clicado.
+        dcol1.download_button('Download full results (CSV)', lambda: exportar_csv(df_resultados), file_name='resultados_exoplanetas.csv', mime='text/csv', use_container_width=True)
+        dcol2.download_button('Download full results (Parquet)', lambda: exportar_parquet(df_resultados), file_name='resultados_exoplanetas.parquet', mime='application/octet-stream', use_container_width=True)
 
     with tab3:
         st.header("Detailed Analysis per Candidate")
         st.markdown("Select a candidate to view the technical justification for its classification.")
 
         if not df_resultados.empty:
-            objeto_selecionado = st.selectbox('Select the Object of Interest (KOI):', df_resultados['kepoi_name'], key="objeto_selecionado")
+            # Só as sugestões do índice vão para o navegador, nunca a lista inteira de KOIs.
+            modo_busca = st.radio('Find candidates by:', ['Highest confidence', 'Most borderline', 'Search by name'], horizontal=True, key='modo_busca_koi')
+            if modo_busca == 'Search by name':
+                busca_koi = st.text_input('Type the beginning of the KOI name:', key='busca_koi')
+                opcoes_koi = indice_koi.buscar(busca_koi)
+                if busca_koi and not opcoes_koi:
+                    st.info(f"No KOI matches '{busca_koi}'.")
+            elif modo_busca == 'Most borderline':
+                opcoes_koi = indice_koi.mais_limitrofes()
+            else:
+                opcoes_koi = indice_koi.mais_confiantes()
+            if opcoes_koi and st.session_state.get('objeto_selecionado') not in opcoes_koi:
+                st.session_state.objeto_selecionado = opcoes_koi[0]
+            objeto_selecionado = st.selectbox('Select the Object of Interest (KOI):', opcoes_koi, key="objeto_selecionado")
             
             if objeto_selecionado:
-                idx = df_resultados.index[df_resultados['kepoi_name'] == objeto_selecionado].tolist()[0]
-                predicao = df_resultados.loc[idx, 'Predicao']
-                confianca = df_resultados.loc[idx, 'Score_Confianca']
+                idx = indice_koi.posicao(objeto_selecionado)
+                predicao = df_resultados['Predicao'].iat[idx]
+                confianca = df_resultados['Score_Confianca'].iat[idx]
                 
                 st.subheader(f"Justification for the Classification of: {objeto_selecionado}")
-                st.write(f"**Prediction:** {predicao} | **Confidence:** {confianca}")
+                st.write(f"**Prediction:** {predicao} | **Confidence:** {confianca:.2f}%")
                 
-                shap_values_classe_1 = shap_values[:, :, 1]
-                
-                plt.figure(figsize=(20, 5))
-                fig = shap.force_plot(
-                    explainer.expected_value[1], 
-                    shap_values_classe_1[idx, :], 
-                    X_final.iloc[idx, :].round(3), 
-                    matplotlib=True,
-                    show=False,
-                    text_rotation=30
+                # Voltar a um candidato já visto reaproveita a figura e o texto renderizados.
+                imagem_force_plot, linhas_narrativa = carregar_cache_renderizacoes().explicacao(
+                    (st.session_state.get('id_analise'), objeto_selecionado),
+                    lambda: renderizar_explicacao(explicacoes, predicao, idx)
                 )
-                st.pyplot(fig, clear_figure=True)
+                st.image(imagem_force_plot, use_container_width=True)
                 st.markdown("<div style='text-align: center; font-size: small;'>SHAP power plot. Features in red push the prediction to 'Confirmed', and those in blue to 'False Positive'.</div>", unsafe_allow_html=True)
 
                 st.subheader("Detailed Technical Justification")
-                
-                mapeamento_explicacoes = {
-                'koi_fpflag_nt': lambda v: f"the **presence of the 'not transit-like signal' flag** (value {v:.0f}), a strong indication against a valid candidate." if v == 1 else f"the **absence of the 'not transit-like signal' flag** (value {v:.0f}), indicating that the light curve is consistent with a transit.",
-                'koi_fpflag_ss': lambda v: f"the **presence of the 'stellar variability' flag** (value {v:.0f}), suggesting that the signal likely arises from stellar activity." if v == 1 else f"the **absence of the 'stellar variability' flag** (value {v:.0f}), suggesting the signal is not caused by starspots.",
-                'koi_fpflag_co': lambda v: f"the **presence of the 'centroid offset' flag** (value {v:.0f}), suggesting contamination from a background star." if v == 1 else f"the **absence of the 'centroid offset' flag** (value {v:.0f}), strengthening the hypothesis that the transit occurs in the target star.",
-                'koi_fpflag_ec': lambda v: f"the **presence of the 'eclipsing binary' flag** (value {v:.0f}), a strong indicator of a false positive." if v == 1 else f"the **absence of the 'eclipsing binary' flag** (value {v:.0f}), reducing the likelihood of a false positive.",
-                'koi_model_snr': lambda v: f"a **high signal-to-noise ratio (SNR) of {v:.2f}**, indicating a clear and strong transit signal." if v > 20 else f"a **low signal-to-noise ratio (SNR) of {v:.2f}**, suggesting a weak or noisy signal.",
-                'koi_impact': lambda v: f"a **high impact parameter of {v:.3f}**, indicating a grazing transit, less likely to be planetary." if v > 0.8 else f"a **low impact parameter of {v:.3f}**, suggesting a central transit across the stellar disk.",
-                'koi_prad': lambda v: f"an **estimated planetary radius of {v:.2f} Earth radii**, which is too large and more characteristic of a small star or brown dwarf." if v > 15 else f"an **estimated planetary radius of {v:.2f} Earth radii**, a plausible size for an exoplanet.",
-                'koi_depth': lambda v: f"a **transit depth of {v:.1f} ppm**, too deep for a rocky planet, suggesting a gas giant or another type of object." if v > 100000 else f"a **transit depth of {v:.1f} ppm**, consistent with a planetary-sized object.",
-                'koi_duration': lambda v: f"a **transit duration of {v:.2f} hours**, consistent with the orbit of a planetary candidate.",
-                'koi_period': lambda v: f"an **orbital period of {v:.2f} days**.",
-                'koi_ror': lambda v: f"a **radius ratio (planet/star) of {v:.4f}**, a key indicator for confirmation.",
-                'koi_incl': lambda v: f"a **high orbital inclination of {v:.2f} degrees**, indicating an edge-on view as expected for transits.",
-                'koi_teq': lambda v: f"an **equilibrium temperature of {v:.0f} K**.",
-                'koi_insol': lambda v: f"an **insolation flux of {v:.2f} (relative to Earth)**.",
-                'koi_dor': lambda v: f"a **transit-to-stellar radius distance of {v:.2f}**.",
-                'koi_ldm_coeff1': lambda v: f"the **limb darkening coefficient (linear) of {v:.3f}**.",
-                'koi_ldm_coeff2': lambda v: f"the **limb darkening coefficient (quadratic) of {v:.3f}**.",
-                'koi_tce_plnt_num': lambda v: f"the **transit event threshold number ({v:.0f})**.",
-                'koi_steff': lambda v: f"the **stellar effective temperature of {v:.0f} K**.",
-                'koi_slogg': lambda v: f"the **stellar surface gravity of {v:.3f} (log10 cm/s²)**.",
-                'koi_srad': lambda v: f"the **stellar radius of {v:.3f} solar radii**.",
-                'koi_smass': lambda v: f"the **stellar mass of {v:.3f} solar masses**.",
-                'ra': lambda v: f"the **right ascension of the star of {v:.3f} degrees**.",
-                'dec': lambda v: f"the **declination of the star of {v:.3f} degrees**.",
-                'koi_kepmag': lambda v: f"the **stellar magnitude in the Kepler filter of {v:.3f}**.",
-                'koi_period_err1': lambda v: f"a **low uncertainty in the orbital period measurement** (+{v:.1e} days), indicating a stable, periodic signal.",
-                'koi_period_err2': lambda v: f"a **low uncertainty in the orbital period measurement** ({v:.1e} days), indicating a stable, periodic signal.",
-                'koi_time0_err1': lambda v: f"a **low uncertainty in the transit timing** (+{v:.1e} days).",
-                'koi_time0_err2': lambda v: f"a **low uncertainty in the transit timing** ({v:.1e} days).",
-                'koi_impact_err1': lambda v: f"a **low uncertainty in the impact parameter** (+{v:.2f}).",
-                'koi_impact_err2': lambda v: f"a **low uncertainty in the impact parameter** ({v:.2f}).",
-                'koi_duration_err1': lambda v: f"a **low uncertainty in the transit duration** (+{v:.1e} hours).",
-                'koi_duration_err2': lambda v: f"a **low uncertainty in the transit duration** ({v:.1e} hours).",
-                'koi_depth_err1': lambda v: f"a **low uncertainty in the transit depth** (+{v:.1f} ppm).",
-                'koi_depth_err2': lambda v: f"a **low uncertainty in the transit depth** ({v:.1f} ppm).",
-                'koi_prad_err1': lambda v: f"a **low uncertainty in the planetary radius** (+{v:.1e} Earth radii).",
-                'koi_prad_err2': lambda v: f"a **low uncertainty in the planetary radius** ({v:.1e} Earth radii).",
-                'koi_insol_err1': lambda v: f"a **low uncertainty in the insolation flux** (+{v:.1f}).",
-                'koi_insol_err2': lambda v: f"a **low uncertainty in the insolation flux** ({v:.1f}).",
-                'koi_dor_err1': lambda v: f"a **low uncertainty in the transit-to-stellar radius distance** (+{v:.1f}).",
-                'koi_dor_err2': lambda v: f"a **low uncertainty in the transit-to-stellar radius distance** ({v:.1f}).",
-                'koi_ror_err1': lambda v: f"a **low uncertainty in the radius ratio** (+{v:.1e}).",
-                'koi_ror_err2': lambda v: f"a **low uncertainty in the radius ratio** ({v:.1e}).",
-                'koi_steff_err1': lambda v: f"a **low uncertainty in the stellar temperature** (+{v:.1f} K).",
-                'koi_steff_err2': lambda v: f"a **low uncertainty in the stellar temperature** ({v:.1f} K).",
-                'koi_slogg_err1': lambda v: f"a **low uncertainty in the stellar surface gravity** (+{v:.2f}).",
-                'koi_slogg_err2': lambda v: f"a **low uncertainty in the stellar surface gravity** ({v:.2f}).",
-                'koi_srad_err1': lambda v: f"a **low uncertainty in the stellar radius** (+{v:.2f}).",
-                'koi_srad_err2': lambda v: f"a **low uncertainty in the stellar radius** ({v:.2f}).",
-                'koi_smass_err1': lambda v: f"a **low uncertainty in the stellar mass** (+{v:.2f}).",
-                'koi_smass_err2': lambda v: f"a **low uncertainty in the stellar mass** ({v:.2f}).",
-                }
-                
-                df_shap = pd.DataFrame({'feature': X_final.columns, 'valor': X_final.iloc[idx, :], 'shap_value': shap_values_classe_1[idx, :]})
-                
-                LIMIAR_DE_IMPACTO = 0.05
-                
-                if predicao == "CONFIRMADO":
-                    st.markdown("The classification as **CONFIRMED** was mainly influenced by the following positive factors:")
-                    fatores = df_shap[df_shap['shap_value'] > LIMIAR_DE_IMPACTO].sort_values(by='shap_value', ascending=False)
-                else: 
-                    st.markdown("The classification as **FALSE POSITIVE** was mainly influenced by the following warning signs:")
-                    fatores = df_shap[df_shap['shap_value'] < -LIMIAR_DE_IMPACTO].sort_values(by='shap_value', ascending=True)
-
-                if not fatores.empty:
-                    for i, (index, row) in enumerate(fatores.iterrows()):
-                        feature_name = row['feature']
-                        valor = row['valor']
-                        
-                        if feature_name in mapeamento_explicacoes:
-                            justificativa = mapeamento_explicacoes[feature_name](valor)
-                            st.markdown(f"{i+1}. {justificativa.capitalize()} (`{feature_name}`)")
-                        else: 
-                            st.markdown(f"{i+1}. O parâmetro `{feature_name}` com valor de `{valor:.3f}` foi um fator relevante.")
-                else:
-                    st.markdown("The prediction for this object was close to the decision threshold, with no individual factors strongly influencing this classification.")
+                for linha in linhas_narrativa:
+                    st.markdown(linha)
         else:
             st.info("No candidates to analyze.")
 
@@ -429,6 +488,8 @@ if st.session_state.get('analysis_complete'):
         mcol2.metric("AUC (ROC)", "0.998")
         st.markdown("---")
         
+        if graficos_desatualizados():
+            st.caption("The model was updated incrementally after these charts were generated; they describe the previous model.")
         gcol1, gcol2 = st.columns(2)
         with gcol1:
             st.subheader("Confusion Matrix")
@@ -438,5 +499,17 @@ if st.session_state.get('analysis_complete'):
             st.subheader("ROC Curve")
             st.image('curva_roc.png')
             st.markdown("<div style='text-align: center; font-size: small;'>The ROC curve illustrates the classifier's ability to distinguish between classes.</div>", unsafe_allow_html=True)
+
+        with st.expander("Loaded model artifacts"):
+            st.dataframe(pd.DataFrame(carregar_registro().relatorio()), use_container_width=True)
+
+        with st.expander("Result cache"):
+            st.json(carregar_cache_resultados().estatisticas())
+
+        with st.expander("Explanation render cache"):
+            st.json(carregar_cache_renderizacoes().estatisticas())
+
+        with st.expander("Session memory"):
+            st.json(memoria_sessao())
 else:
-    st.info("Waiting for a CSV file upload to start analysis.")
\ No newline at end of file
+    st.info("Waiting for a KOI file upload to start analysis.")
\ No newline at end of file
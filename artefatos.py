@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+
+from instrumentacao import estagio, memoria_residente
+from motor_floresta import ARQUIVO_MANIFESTO, FlorestaCompilada, hash_bytes, ler_manifesto
+from preprocessamento import PlanoColunas
+
+DIRETORIO_ARTEFATOS = os.path.dirname(os.path.abspath(__file__))
+DIRETORIO_MODELO_COMPILADO = 'modelo_compilado'
+MENSAGEM_ARTEFATOS_AUSENTES = "Arquivos de modelo/explicador não encontrados. Execute o script 'preparar_artefatos.py' primeiro."
+
+logger = logging.getLogger(__name__)
+
+
+def _carregar_json(caminho):
+    with open(caminho, 'r') as f:
+        return json.load(f)
+
+
+def _carregar_mapeado(caminho):
+    # Os vetores gravados pelo joblib.dump são mapeados em memória somente leitura: processos
+    # na mesma máquina compartilham as páginas. Pickles comuns continuam sendo lidos, sem mapeamento.
+    return joblib.load(caminho, mmap_mode='r')
+
+
+class RegistroArtefatos:
+    """Carrega cada artefato do modelo uma única vez por processo, sob demanda.
+
+    O explicador SHAP só é lido do disco quando a primeira explicação é pedida;
+    seus vetores são mapeados em memória, então o app e os workers dos CLIs
+    compartilham essas páginas. Se existir o pacote `modelo_compilado/`, a
+    floresta compilada (usada pelo serviço) também é mapeada em memória a
+    partir dele; senão é compilada a partir do pickle. O RandomForest do
+    scikit-learn, usado pelo app e pelos CLIs de lote, não tem equivalente: o
+    scikit-learn copia os nós de cada árvore ao ler o pickle, então cada
+    processo tem sua própria cópia.
+    Tempo de carga e crescimento da memória residente de cada artefato ficam em
+    `estatisticas`.
+    """
+
+    ARQUIVOS = {
+        'modelo': ('modelo_random_forest.pkl', joblib.load),
+        'colunas_modelo': ('colunas_modelo.json', _carregar_json),
+        'valores_imputacao': ('valores_imputacao.json', _carregar_json),
+        'explainer': ('shap_explainer.pkl', _carregar_mapeado),
+    }
+    DERIVADOS = {
+        'floresta_compilada': lambda registro: registro._construir_floresta(),
+        'plano_colunas': lambda registro: PlanoColunas(registro.colunas_modelo, registro.valores_imputacao),
+        # Forma compacta usada pelo app: a floresta compara as features em float32 de qualquer forma.
+        'plano_colunas_float32': lambda registro: PlanoColunas(registro.colunas_modelo, registro.valores_imputacao, np.float32),
+    }
+    ESSENCIAIS = ('colunas_modelo', 'valores_imputacao')
+
+    def __init__(self, diretorio=DIRETORIO_ARTEFATOS):
+        self.diretorio = diretorio
+        self.estatisticas = {}
+        self._artefatos = {}
+        self._lock = threading.Lock()
+        self._impressao_digital = None
+
+    @property
+    def modelo(self):
+        return self.obter('modelo')
+
+    @property
+    def colunas_modelo(self):
+        return self.obter('colunas_modelo')
+
+    @property
+    def valores_imputacao(self):
+        return self.obter('valores_imputacao')
+
+    @property
+    def explainer(self):
+        return self.obter('explainer')
+
+    @property
+    def floresta_compilada(self):
+        return self.obter('floresta_compilada')
+
+    @property
+    def plano_colunas(self):
+        return self.obter('plano_colunas')
+
+    @property
+    def plano_colunas_float32(self):
+        return self.obter('plano_colunas_float32')
+
+    def obter(self, nome):
+        artefato = self._artefatos.get(nome)
+        if artefato is None:
+            if nome in self.DERIVADOS:
+                # Derivados dependem de outros artefatos; construí-los fora do lock evita deadlock.
+                artefato = self._medir(nome, None, lambda: self.DERIVADOS[nome](self))
+                with self._lock:
+                    artefato = self._artefatos.setdefault(nome, artefato)
+            else:
+                with self._lock:
+                    if nome not in self._artefatos:
+                        self._artefatos[nome] = self._carregar(nome)
+                    artefato = self._artefatos[nome]
+        return artefato
+
+    def impressao_digital(self):
+        # Hash do conteúdo dos arquivos de artefatos: muda sempre que o modelo é re-treinado.
+        if self._impressao_digital is None:
+            hash_artefatos = hashlib.sha256()
+            for arquivo, _ in self.ARQUIVOS.values():
+                caminho = os.path.join(self.diretorio, arquivo)
+                if not os.path.exists(caminho):
+                    continue
+                hash_artefatos.update(arquivo.encode())
+                with open(caminho, 'rb') as f:
+                    for parte in iter(lambda: f.read(1 << 20), b''):
+                        hash_artefatos.update(parte)
+            # O manifesto já traz os checksums de cada vetor do pacote compilado.
+            manifesto = os.path.join(self.diretorio, DIRETORIO_MODELO_COMPILADO, ARQUIVO_MANIFESTO)
+            if os.path.exists(manifesto):
+                with open(manifesto, 'rb') as f:
+                    hash_artefatos.update(f.read())
+            self._impressao_digital = hash_artefatos.hexdigest()
+        return self._impressao_digital
+
+    def carregar_essenciais(self, artefato_modelo='modelo'):
+        # `artefato_modelo` é 'floresta_compilada' para quem pontua com o motor compilado.
+        for nome in self.ESSENCIAIS + (artefato_modelo,):
+            self.obter(nome)
+        return self
+
+    def carregado(self, nome):
+        return nome in self._artefatos
+
+    def _carregar(self, nome):
+        arquivo, carregador = self.ARQUIVOS[nome]
+        caminho = os.path.join(self.diretorio, arquivo)
+        try:
+            artefato = self._medir(nome, caminho, lambda: carregador(caminho))
+        except FileNotFoundError:
+            raise RuntimeError(MENSAGEM_ARTEFATOS_AUSENTES)
+        if nome == 'modelo':
+            self._verificar_modelo(caminho)
+        return artefato
+
+    def _diretorio_compilado(self):
+        diretorio = os.path.join(self.diretorio, DIRETORIO_MODELO_COMPILADO)
+        return diretorio if os.path.exists(os.path.join(diretorio, ARQUIVO_MANIFESTO)) else None
+
+    def _construir_floresta(self):
+        diretorio = self._diretorio_compilado()
+        if diretorio is None:
+            return FlorestaCompilada.compilar(self.modelo)
+        return FlorestaCompilada.carregar(diretorio, self.colunas_modelo)
+
+    def _verificar_modelo(self, caminho):
+        # Os dois motores precisam usar a mesma floresta.
+        diretorio = self._diretorio_compilado()
+        if diretorio is None:
+            return
+        hash_modelo = ler_manifesto(diretorio).get('modelo_sha256')
+        if not hash_modelo:
+            return
+        with open(caminho, 'rb') as f:
+            if hash_bytes(f.read()) != hash_modelo:
+                raise RuntimeError(f"'{os.path.basename(caminho)}' não corresponde ao modelo compilado em '{diretorio}'. Execute o script 'preparar_artefatos.py' novamente.")
+
+    def _medir(self, nome, caminho, carregar):
+        memoria_antes = memoria_residente()
+        inicio = time.perf_counter()
+        with estagio(f"carga_{nome}"):
+            artefato = carregar()
+        tempo = time.perf_counter() - inicio
+        memoria = None if memoria_antes is None else memoria_residente() - memoria_antes
+        self.estatisticas[nome] = {
+            'arquivo': os.path.basename(caminho) if caminho else None,
+            'tempo_carga_s': tempo,
+            'memoria_bytes': memoria,
+            'tamanho_arquivo_bytes': os.path.getsize(caminho) if caminho else None,
+        }
+        logger.info("Artefato '%s' carregado em %.3f s (%s bytes de memória residente)", nome, tempo, memoria)
+        return artefato
+
+    def relatorio(self):
+        return [{'artefato': nome, **dados} for nome, dados in self.estatisticas.items()]
+
+
+_registro = None
+_lock_registro = threading.Lock()
+
+
+def obter_registro():
+    global _registro
+    if _registro is None:
+        with _lock_registro:
+            if _registro is None:
+                _registro = RegistroArtefatos()
+    return _registro
@@ -0,0 +1,154 @@
+# atualizar_artefatos.py
+# Atualiza os artefatos com KOIs recém-classificados, sem re-treinar a floresta inteira:
+# as médias de imputação são atualizadas de forma incremental e árvores treinadas só
+# com as linhas novas são acrescentadas ao modelo (ou substituem as mais antigas).
+# Uso: python atualizar_artefatos.py novos_kois.csv [--arvores 10] [--substituir-antigas]
+# Depois de uma atualização, preparar_artefatos.py se recusa a re-treinar; para descartar as
+# atualizações e treinar do zero com dados.csv: python preparar_artefatos.py --forcar
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+import shap
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+from motor_floresta import FlorestaCompilada
+from preparar_artefatos import ARQUIVO_CONTAGENS, ARQUIVO_DADOS, carregar_dados, hash_arquivo, preprocessar
+from preprocessamento import PlanoColunas
+
+MAPEAMENTO_ROTULOS = {'FALSE POSITIVE': 0, 'CONFIRMED': 1}
+N_ARVORES_NOVAS = 10
+
+
+def ler_rotulados(caminho, colunas_modelo):
+    interesse = set(colunas_modelo) | {'koi_disposition'}
+    df = pd.read_csv(caminho, usecols=lambda col: col in interesse)
+    df = df[df['koi_disposition'].isin(MAPEAMENTO_ROTULOS)]
+    return df.reindex(columns=colunas_modelo), df['koi_disposition'].map(MAPEAMENTO_ROTULOS).to_numpy()
+
+
+def carregar_contagens():
+    if os.path.exists(ARQUIVO_CONTAGENS):
+        with open(ARQUIVO_CONTAGENS, 'r') as f:
+            return json.load(f)
+    # Artefatos gerados antes das contagens existirem: reconstrói a partir dos dados de treino.
+    if os.path.exists(ARQUIVO_DADOS):
+        print(f"'{ARQUIVO_CONTAGENS}' não encontrado; reconstruindo as contagens a partir de '{ARQUIVO_DADOS}'...")
+        X_treino, _ = preprocessar(carregar_dados()[0])
+        return {col: int(n) for col, n in X_treino.count().items()}
+    sys.exit(f"'{ARQUIVO_CONTAGENS}' não encontrado. Execute o script 'preparar_artefatos.py' primeiro.")
+
+
+def atualizar_medias(valores_imputacao, contagens, X_novos):
+    # Média incremental por coluna: só os valores presentes nas linhas novas entram na conta.
+    valores_imputacao, contagens = dict(valores_imputacao), dict(contagens)
+    presentes = X_novos.count()
+    somas = X_novos.sum()
+    for coluna, n_novos in presentes.items():
+        if n_novos == 0:
+            continue
+        media = valores_imputacao.get(coluna, 0)
+        n_total = contagens.get(coluna, 0) + int(n_novos)
+        valores_imputacao[coluna] = media + (float(somas[coluna]) - n_novos * media) / n_total
+        contagens[coluna] = n_total
+    return valores_imputacao, contagens
+
+
+def avaliar(modelo, X, y):
+    probabilidades = modelo.predict_proba(X)[:, 1]
+    metricas = {'acuracia': float(accuracy_score(y, modelo.classes_[(probabilidades > 0.5).astype(int)]))}
+    if len(np.unique(y)) == 2:
+        metricas['auc_roc'] = float(roc_auc_score(y, probabilidades))
+    return metricas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Atualiza o modelo com KOIs recém-classificados, sem re-treino completo.")
+    parser.add_argument('novos', help="CSV no formato da tabela KOI com a coluna koi_disposition.")
+    parser.add_argument('--arvores', type=int, default=N_ARVORES_NOVAS, help="Árvores treinadas com as linhas novas.")
+    parser.add_argument('--substituir-antigas', action='store_true', help="Remove as árvores mais antigas, mantendo o tamanho do modelo.")
+    parser.add_argument('--processos', type=int, default=-1)
+    args = parser.parse_args(argv)
+    inicio = time.perf_counter()
+
+    with open('colunas_modelo.json', 'r') as f:
+        colunas_modelo = json.load(f)
+    with open('valores_imputacao.json', 'r') as f:
+        valores_imputacao = json.load(f)
+    modelo = joblib.load('modelo_random_forest.pkl')
+
+    X_novos, y_novos = ler_rotulados(args.novos, colunas_modelo)
+    print(f"{len(y_novos)} KOIs classificados em '{args.novos}'.")
+    if len(np.unique(y_novos)) < 2:
+        sys.exit("As linhas novas precisam ter KOIs CONFIRMED e FALSE POSITIVE para treinar novas árvores.")
+
+    # 1. Avaliação antes do treino: o modelo atual nunca viu essas linhas.
+    X_antes, *_ = PlanoColunas(colunas_modelo, valores_imputacao).transformar(X_novos)
+    metricas_antes = avaliar(modelo, pd.DataFrame(X_antes, columns=colunas_modelo), y_novos)
+    print(f"Modelo atual nas linhas novas: acurácia {metricas_antes['acuracia']*100:.1f}%"
+          + (f", AUC {metricas_antes['auc_roc']:.3f}" if 'auc_roc' in metricas_antes else ""))
+
+    # 2. Médias de imputação incrementais
+    valores_imputacao, contagens = atualizar_medias(valores_imputacao, carregar_contagens(), X_novos)
+    X_depois, *_ = PlanoColunas(colunas_modelo, valores_imputacao).transformar(X_novos)
+    X_depois = pd.DataFrame(X_depois, columns=colunas_modelo)
+
+    # 3. Árvores novas com warm start; as antigas são reaproveitadas como estão
+    n_antes = len(modelo.estimators_)
+    modelo.set_params(warm_start=True, n_estimators=n_antes + args.arvores, n_jobs=args.processos)
+    modelo.fit(X_depois, y_novos)
+    removidas = 0
+    if args.substituir_antigas:
+        removidas = args.arvores
+        modelo.estimators_ = modelo.estimators_[removidas:]
+    modelo.set_params(warm_start=False, n_estimators=len(modelo.estimators_), n_jobs=None)
+    print(f"Modelo atualizado: {n_antes} -> {len(modelo.estimators_)} árvores ({args.arvores} novas, {removidas} removidas).")
+    # Linhas já vistas pelas árvores novas: mostra o quanto o modelo absorveu, não generalização.
+    metricas_depois = avaliar(modelo, X_depois, y_novos)
+    print(f"Modelo atualizado nas linhas novas: acurácia {metricas_depois['acuracia']*100:.1f}%"
+          + (f", AUC {metricas_depois['auc_roc']:.3f}" if 'auc_roc' in metricas_depois else ""))
+
+    # 4. Gravar os artefatos, o explicador e o modelo compilado
+    with open('valores_imputacao.json', 'w') as f:
+        json.dump(valores_imputacao, f, indent=4)
+    with open(ARQUIVO_CONTAGENS, 'w') as f:
+        json.dump(contagens, f, indent=4)
+    joblib.dump(modelo, 'modelo_random_forest.pkl')
+    joblib.dump(shap.TreeExplainer(modelo), 'shap_explainer.pkl')
+    FlorestaCompilada.compilar(modelo).salvar('modelo_compilado', colunas_modelo, hash_arquivo('modelo_random_forest.pkl'))
+
+    # 5. Métricas: só o que mudou, sem refazer a validação cruzada
+    metricas = {}
+    if os.path.exists('metricas_modelo.json'):
+        with open('metricas_modelo.json', 'r') as f:
+            metricas = json.load(f)
+    duracao = time.perf_counter() - inicio
+    metricas.setdefault('atualizacoes', []).append({
+        'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'arquivo': os.path.basename(args.novos),
+        'linhas_novas': int(len(y_novos)),
+        'antes_do_treino': metricas_antes,
+        'depois_do_treino': metricas_depois,
+        'arvores_adicionadas': args.arvores,
+        'arvores_removidas': removidas,
+        'n_arvores': len(modelo.estimators_),
+        'tempo_s': duracao,
+    })
+    # A matriz de confusão e a curva ROC vêm da validação cruzada do treino completo;
+    # não há como refazê-las sem re-treinar, então ficam marcadas como desatualizadas.
+    metricas['graficos_desatualizados'] = True
+    with open('metricas_modelo.json', 'w') as f:
+        json.dump(metricas, f, indent=4)
+
+    print(f"\nArtefatos atualizados em {duracao:.1f} s.")
+    print("'matriz_confusao.png' e 'curva_roc.png' ainda descrevem o modelo anterior; 'preparar_artefatos.py --forcar' os refaz.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Compara a leitura completa do arquivo enviado (pd.read_csv de todas as colunas,
+# como o app fazia) com os leitores projetados de leitores.py, em CSV, Parquet e
+# Feather, para tabelas com cada vez mais colunas que o modelo ignora.
+# Uso, a partir da raiz do projeto:
+#     python -m benchmarks.bench_leitura --linhas 100000 --colunas-extras 0 90 300
+import argparse
+import time
+from io import BytesIO
+
+import pandas as pd
+
+from artefatos import obter_registro
+from benchmarks.gerador_koi import gerar_kois
+from leitores import ler_tabela
+
+
+def medir(funcao, repeticoes):
+    # Tamanho do DataFrame lido em vez do pico do tracemalloc: os buffers do
+    # pyarrow são alocados fora do Python e não apareceriam na medição.
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        df = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), int(df.memory_usage(index=False, deep=True).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos leitores de entrada com projeção de colunas.")
+    parser.add_argument('--linhas', type=int, default=100000)
+    parser.add_argument('--colunas-extras', type=int, nargs='+', default=[0, 90, 300])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    registro = obter_registro()
+    colunas_modelo = registro.colunas_modelo
+
+    print(f"{'extras':>7} {'leitor':<24} {'tempo (s)':>10} {'DataFrame (MB)':>15}")
+    for colunas_extras in args.colunas_extras:
+        df = gerar_kois(args.linhas, colunas_modelo, registro.valores_imputacao, 0.0, 0.02, colunas_extras)
+        conteudos = {'csv': df.to_csv(index=False).encode()}
+        for formato, gravar in (('parquet', df.to_parquet), ('feather', df.to_feather)):
+            buffer = BytesIO()
+            gravar(buffer)
+            conteudos[formato] = buffer.getvalue()
+        del df
+
+        leitores = {
+            'pd.read_csv (completo)': lambda: pd.read_csv(BytesIO(conteudos['csv'])),
+            **{f"ler_tabela ({formato})": (lambda formato=formato: ler_tabela(conteudos[formato], colunas_modelo, formato)) for formato in conteudos},
+        }
+        for nome, leitor in leitores.items():
+            tempo, tamanho = medir(leitor, args.repeticoes)
+            print(f"{colunas_extras:>7} {nome:<24} {tempo:>10.4f} {tamanho / 2**20:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# Compara o motor compilado (motor_floresta.py) com o predict_proba do scikit-learn.
+# Uso, a partir da raiz do projeto:
+#     python -m benchmarks.bench_motor_floresta --tamanhos 1 10 100 1000 100000 1000000
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from artefatos import obter_registro
+from motor_floresta import gerar_linhas
+
+
+def cronometrar(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do motor de floresta compilado contra o scikit-learn.")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1, 10, 100, 1000, 100000, 1000000])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    registro = obter_registro()
+    modelo = registro.modelo
+    floresta = registro.floresta_compilada
+    colunas = registro.colunas_modelo
+
+    print(f"{'linhas':>10} {'sklearn (s)':>12} {'compilado (s)':>14} {'aceleração':>11} {'idênticos':>10}")
+    for n_linhas in args.tamanhos:
+        X = gerar_linhas(floresta, len(colunas), n_linhas)
+        df = pd.DataFrame(X, columns=colunas)
+        tempo_sklearn, proba_sklearn = cronometrar(lambda: modelo.predict_proba(df), args.repeticoes)
+        tempo_compilado, proba_compilado = cronometrar(lambda: floresta.predict_proba(X), args.repeticoes)
+        identicos = np.array_equal(proba_sklearn, proba_compilado)
+        print(f"{n_linhas:>10} {tempo_sklearn:>12.4f} {tempo_compilado:>14.4f} {tempo_sklearn / tempo_compilado:>10.2f}x {str(identicos):>10}")
+
+
+if __name__ == '__main__':
+    main()
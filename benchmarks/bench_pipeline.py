@@ -0,0 +1,140 @@
+# Tempo e memória de cada estágio do pipeline de classificação, em vários
+# tamanhos de lote, sobre tabelas KOI sintéticas (benchmarks/gerador_koi.py).
+# O resultado é gravado em JSON com o commit atual, para comparar versões.
+# Uso, a partir da raiz do projeto:
+#     python -m benchmarks.bench_pipeline --tamanhos 1000 10000 100000
+#     python -m benchmarks.bench_pipeline --comparar benchmarks/resultados/pipeline_<commit>.json
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from artefatos import obter_registro
+from benchmarks.gerador_koi import gerar_kois
+from leitores import ler_tabela
+from pipeline import (MOTOR_PADRAO, MOTORES, _formatar_resultado, _preparar_dados, memoria_resultado, prever_com_confianca,
+                      processar_e_prever)
+
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+
+def estado_git():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        sujo = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, sujo
+
+
+def medir(funcao, repeticoes):
+    # Tempos sem rastreamento; o pico de memória vem de uma execução à parte,
+    # porque o tracemalloc deixa as alocações bem mais lentas.
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'tempo_s': min(tempos), 'tempo_medio_s': float(np.mean(tempos)), 'pico_memoria_bytes': pico}, resultado
+
+
+def estagios(n_linhas, args, registro):
+    df = gerar_kois(n_linhas, registro.colunas_modelo, registro.valores_imputacao, args.taxa_colunas_ausentes, args.taxa_nan, args.colunas_extras)
+    conteudo = df.to_csv(index=False).encode()
+    del df
+
+    medicao, df_bruto = medir(lambda: ler_tabela(conteudo, registro.colunas_modelo), args.repeticoes)
+    yield 'leitura_csv', n_linhas, medicao
+    medicao, (X_final, linhas_imputadas, _, _) = medir(lambda: _preparar_dados(df_bruto, registro), args.repeticoes)
+    yield 'selecao_imputacao', n_linhas, medicao
+    medicao, _ = medir(lambda: registro.modelo.predict(X_final), args.repeticoes)
+    yield 'predict', n_linhas, medicao
+    medicao, (predicoes, confianca) = medir(lambda: prever_com_confianca(X_final, registro=registro, motor=args.motor), args.repeticoes)
+    yield 'predict_proba', n_linhas, medicao
+    # O SHAP é ordens de grandeza mais caro por linha; mede-se numa amostra.
+    X_shap = X_final.iloc[:min(n_linhas, args.max_linhas_shap)]
+    medicao, _ = medir(lambda: registro.explainer.shap_values(X_shap), 1)
+    yield 'shap', len(X_shap), medicao
+    medicao, _ = medir(lambda: _formatar_resultado(df_bruto, X_final, linhas_imputadas, predicoes, confianca), args.repeticoes)
+    yield 'formatacao', n_linhas, medicao
+    medicao, (df_resultado, _, explicacoes) = medir(lambda: processar_e_prever(df_bruto, registro=registro, motor=args.motor), args.repeticoes)
+    # O que uma sessão do app guarda depois da análise (sem SHAP calculado ainda).
+    medicao['memoria_sessao_bytes'] = sum(memoria_resultado(df_resultado, explicacoes).values())
+    yield 'processar_e_prever', n_linhas, medicao
+
+
+def comparar(resultados, caminho_base):
+    with open(caminho_base, 'r') as f:
+        base = json.load(f)
+    tempos_base = {(r['linhas_lote'], r['estagio']): r['tempo_s'] for r in base['resultados']}
+    print(f"\nComparação com {caminho_base} (commit {str(base.get('commit'))[:10]}):")
+    print(f"{'lote':>8} {'estágio':<20} {'base (s)':>10} {'atual (s)':>10} {'razão':>7}")
+    for r in resultados:
+        anterior = tempos_base.get((r['linhas_lote'], r['estagio']))
+        if anterior:
+            print(f"{r['linhas_lote']:>8} {r['estagio']:<20} {anterior:>10.4f} {r['tempo_s']:>10.4f} {r['tempo_s'] / anterior:>6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark por estágio do pipeline de classificação.")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--taxa-colunas-ausentes', type=float, default=0.02)
+    parser.add_argument('--taxa-nan', type=float, default=0.02)
+    parser.add_argument('--colunas-extras', type=int, default=90)
+    parser.add_argument('--max-linhas-shap', type=int, default=200)
+    parser.add_argument('--motor', choices=MOTORES, default=MOTOR_PADRAO)
+    parser.add_argument('--saida', help="Arquivo JSON dos resultados (padrão: benchmarks/resultados/pipeline_<commit>.json).")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para comparar os tempos.")
+    args = parser.parse_args()
+
+    registro = obter_registro()
+    registro.carregar_essenciais()
+    registro.explainer
+    commit, sujo = estado_git()
+
+    resultados = []
+    print(f"{'lote':>8} {'estágio':<20} {'linhas':>8} {'tempo (s)':>10} {'linhas/s':>12} {'pico (MB)':>10}")
+    for n_linhas in args.tamanhos:
+        for estagio, linhas, medicao in estagios(n_linhas, args, registro):
+            resultado = {'linhas_lote': n_linhas, 'estagio': estagio, 'linhas': linhas, **medicao,
+                         'linhas_por_s': linhas / medicao['tempo_s'] if medicao['tempo_s'] else None}
+            resultados.append(resultado)
+            print(f"{n_linhas:>8} {estagio:<20} {linhas:>8} {medicao['tempo_s']:>10.4f} {resultado['linhas_por_s']:>12,.0f} {medicao['pico_memoria_bytes'] / 2**20:>10.1f}")
+
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f"pipeline_{(commit or 'sem_git')[:10]}{'_sujo' if sujo else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'alteracoes_nao_commitadas': sujo,
+            'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'ambiente': {
+                'python': platform.python_version(), 'plataforma': platform.platform(), 'nucleos': os.cpu_count(),
+                'numpy': np.__version__, 'pandas': pd.__version__, 'sklearn': sklearn.__version__,
+            },
+            'parametros': {chave: valor for chave, valor in vars(args).items() if chave not in ('saida', 'comparar')},
+            'resultados': resultados,
+        }, f, indent=4)
+    print(f"\nResultados gravados em '{saida}'.")
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+
+if __name__ == '__main__':
+    main()
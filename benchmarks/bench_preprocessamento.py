@@ -0,0 +1,62 @@
+# Compara o plano de colunas compilado (preprocessamento.py) com o caminho
+# anterior de processar_e_prever (cópia, seleção, atribuição coluna a coluna e fillna).
+# Uso, a partir da raiz do projeto:
+#     python -m benchmarks.bench_preprocessamento --tamanhos 10000 100000
+import argparse
+import time
+
+import numpy as np
+
+from artefatos import obter_registro
+from benchmarks.gerador_koi import gerar_kois
+
+COLUNAS_EXTRAS = 90
+
+
+def preparar_caminho_anterior(df_bruto, colunas_modelo, valores_imputacao):
+    df_processado = df_bruto.copy()
+    colunas_interesse = colunas_modelo + ['kepoi_name']
+    colunas_presentes = [col for col in colunas_interesse if col in df_processado.columns]
+    df_processado = df_processado[colunas_presentes]
+    colunas_ausentes = set(colunas_modelo) - set(df_processado.columns)
+    for col in colunas_ausentes:
+        df_processado[col] = valores_imputacao.get(col, 0)
+    df_imputacao_check = df_processado[colunas_modelo]
+    colunas_com_nan = df_imputacao_check.columns[df_imputacao_check.isnull().any()].tolist()
+    if colunas_com_nan:
+        df_processado = df_processado.fillna(valores_imputacao)
+    return df_processado[colunas_modelo].to_numpy()
+
+
+def cronometrar(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pré-processamento compilado contra o caminho anterior.")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    registro = obter_registro()
+    colunas_modelo = registro.colunas_modelo
+    valores_imputacao = registro.valores_imputacao
+    plano = registro.plano_colunas
+
+    print(f"{'linhas':>10} {'anterior (s)':>13} {'plano (s)':>10} {'aceleração':>11} {'idênticos':>10}")
+    for n_linhas in args.tamanhos:
+        # Tabela larga como a do arquivo KOI: uma coluna do modelo ausente, NaN esparsos e colunas que o modelo ignora.
+        df = gerar_kois(n_linhas, colunas_modelo, valores_imputacao, 1 / len(colunas_modelo), 0.02, COLUNAS_EXTRAS)
+        tempo_anterior, X_anterior = cronometrar(lambda: preparar_caminho_anterior(df, colunas_modelo, valores_imputacao), args.repeticoes)
+        tempo_plano, (X_plano, *_) = cronometrar(lambda: plano.transformar(df), args.repeticoes)
+        identicos = np.array_equal(X_anterior, X_plano)
+        print(f"{n_linhas:>10} {tempo_anterior:>13.4f} {tempo_plano:>10.4f} {tempo_anterior / tempo_plano:>10.2f}x {str(identicos):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# Gerador de tabelas KOI sintéticas para os benchmarks, com as colunas de
+# colunas_modelo.json, taxas configuráveis de colunas ausentes e de células
+# vazias, e colunas que o modelo ignora (como no arquivo real da NASA).
+# Uso, a partir da raiz do projeto:
+#     python -m benchmarks.gerador_koi --linhas 100000 --taxa-nan 0.02 --saida koi_sintetico.csv
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from artefatos import obter_registro
+
+
+def gerar_kois(n_linhas, colunas_modelo, valores_imputacao, taxa_colunas_ausentes=0.0, taxa_nan=0.0, colunas_extras=0, semente=42):
+    rng = np.random.default_rng(semente)
+    n_ausentes = int(round(taxa_colunas_ausentes * len(colunas_modelo)))
+    ausentes = set(rng.choice(colunas_modelo, n_ausentes, replace=False)) if n_ausentes else set()
+
+    dados = {'kepoi_name': [f"K{i:08d}.01" for i in range(n_linhas)]}
+    for coluna in colunas_modelo:
+        if coluna in ausentes:
+            continue
+        if coluna.startswith('koi_fpflag'):
+            valores = (rng.random(n_linhas) < 0.25).astype(float)
+        else:
+            valores = valores_imputacao.get(coluna, 1.0) * rng.lognormal(0, 0.5, n_linhas)
+        if taxa_nan:
+            valores[rng.random(n_linhas) < taxa_nan] = np.nan
+        dados[coluna] = valores
+    for i in range(colunas_extras):
+        dados[f"extra_{i}"] = rng.random(n_linhas)
+    return pd.DataFrame(dados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um CSV sintético no formato da tabela KOI.")
+    parser.add_argument('--linhas', type=int, default=10000)
+    parser.add_argument('--taxa-colunas-ausentes', type=float, default=0.0)
+    parser.add_argument('--taxa-nan', type=float, default=0.0)
+    parser.add_argument('--colunas-extras', type=int, default=0)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', required=True)
+    args = parser.parse_args()
+
+    registro = obter_registro()
+    df = gerar_kois(args.linhas, registro.colunas_modelo, registro.valores_imputacao, args.taxa_colunas_ausentes,
+                    args.taxa_nan, args.colunas_extras, args.semente)
+    df.to_csv(args.saida, index=False)
+    print(f"{len(df)} linhas e {len(df.columns)} colunas gravadas em '{args.saida}'.")
+
+
+if __name__ == '__main__':
+    main()
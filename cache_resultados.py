@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+LIMITE_MEMORIA_BYTES = 512 * 1024 * 1024
+LIMITE_DISCO_BYTES = 2 * 1024 * 1024 * 1024
+# Entra na chave: quando o formato das entradas muda, as antigas (em disco) deixam de ser encontradas.
+VERSAO_ENTRADAS = 2
+
+logger = logging.getLogger(__name__)
+
+
+def chave_resultado(conteudo, impressao_digital, *parametros):
+    # O mesmo arquivo só reaproveita resultados do mesmo modelo e dos mesmos parâmetros.
+    hash_chave = hashlib.sha256(conteudo)
+    hash_chave.update(f"v{VERSAO_ENTRADAS}".encode())
+    hash_chave.update(impressao_digital.encode())
+    for parametro in parametros:
+        hash_chave.update(repr(parametro).encode())
+    return hash_chave.hexdigest()
+
+
+def tamanho_em_bytes(valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return int(np.sum(valor.memory_usage(deep=True)))
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, (list, tuple)):
+        return sum(tamanho_em_bytes(v) for v in valor)
+    if isinstance(valor, str):
+        return len(valor)
+    return getattr(valor, 'nbytes', 0)
+
+
+class CacheResultados:
+    """Cache de resultados de análise indexado pelo hash do arquivo enviado.
+
+    Os valores são compartilhados entre sessões e não devem ser alterados;
+    guarde só dados imutáveis (o estado de cada sessão é montado a partir deles).
+    Mantém um LRU em memória limitado por `limite_memoria_bytes` e, se
+    `diretorio` for informado, uma cópia em disco limitada por
+    `limite_disco_bytes` (as entradas acessadas há mais tempo saem primeiro).
+    """
+
+    def __init__(self, limite_memoria_bytes=LIMITE_MEMORIA_BYTES, diretorio=None, limite_disco_bytes=LIMITE_DISCO_BYTES):
+        self.limite_memoria_bytes = limite_memoria_bytes
+        self.diretorio = diretorio
+        self.limite_disco_bytes = limite_disco_bytes
+        self._memoria = OrderedDict()
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.tempo_economizado_s = 0.0
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+    def obter(self, chave):
+        with self._lock:
+            entrada = self._memoria.get(chave)
+            if entrada is not None:
+                self._memoria.move_to_end(chave)
+        if entrada is None and self.diretorio:
+            entrada = self._ler_disco(chave)
+            if entrada is not None:
+                self._guardar_memoria(chave, entrada)
+        with self._lock:
+            if entrada is None:
+                self.falhas += 1
+                return None
+            valor, tempo_calculo, _ = entrada
+            self.acertos += 1
+            self.tempo_economizado_s += tempo_calculo
+        logger.info("Resultado servido do cache (%.2f s economizados)", tempo_calculo)
+        return valor
+
+    def guardar(self, chave, valor, tempo_calculo):
+        entrada = (valor, tempo_calculo, tamanho_em_bytes(valor))
+        self._guardar_memoria(chave, entrada)
+        if self.diretorio:
+            self._gravar_disco(chave, entrada)
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'tempo_economizado_s': self.tempo_economizado_s,
+                'entradas_memoria': len(self._memoria),
+                'bytes_memoria': self._bytes_memoria,
+            }
+
+    def _guardar_memoria(self, chave, entrada):
+        tamanho = entrada[2]
+        if tamanho > self.limite_memoria_bytes:
+            return
+        with self._lock:
+            anterior = self._memoria.pop(chave, None)
+            if anterior is not None:
+                self._bytes_memoria -= anterior[2]
+            self._memoria[chave] = entrada
+            self._bytes_memoria += tamanho
+            while self._bytes_memoria > self.limite_memoria_bytes:
+                _, removida = self._memoria.popitem(last=False)
+                self._bytes_memoria -= removida[2]
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.pkl")
+
+    def _ler_disco(self, chave):
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, 'rb') as f:
+                entrada = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning("Entrada corrompida no cache em disco descartada: %s", caminho)
+            os.remove(caminho)
+            return None
+        # O horário de modificação marca o último acesso, usado na remoção.
+        os.utime(caminho)
+        return entrada
+
+    def _gravar_disco(self, chave, entrada):
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        with os.fdopen(descritor, 'wb') as f:
+            pickle.dump(entrada, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, self._caminho(chave))
+        self._limpar_disco()
+
+    def _limpar_disco(self):
+        arquivos = []
+        for nome in os.listdir(self.diretorio):
+            if nome.endswith('.pkl'):
+                caminho = os.path.join(self.diretorio, nome)
+                estado = os.stat(caminho)
+                arquivos.append((estado.st_mtime, estado.st_size, caminho))
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.limite_disco_bytes:
+                break
+            os.remove(caminho)
+            total -= tamanho
+
@@ -0,0 +1,119 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import partial
+
+import numpy as np
+
+from artefatos import obter_registro
+from instrumentacao import estagio
+
+CAPACIDADE_PADRAO = 256
+TAMANHO_LOTE_AQUECIMENTO = 32
+# Quantos KOIs limítrofes ter os valores SHAP pré-calculados em segundo plano após cada análise (0 desativa).
+AQUECER = int(os.environ.get('EXOPLANETAS_AQUECER', 0))
+
+
+class ProvedorExplicacoes:
+    """Calcula valores SHAP sob demanda, apenas para as linhas solicitadas.
+
+    Os resultados ficam em um cache LRU limitado a `capacidade` linhas, de modo
+    que a memória da sessão não cresce com o tamanho do lote enviado. Só os
+    valores da classe positiva (CONFIRMADO) são guardados, em float32. O
+    explicador só é obtido (via `carregar_explainer`) no primeiro cálculo.
+    """
+
+    def __init__(self, X_final, carregar_explainer, capacidade=CAPACIDADE_PADRAO):
+        self.X_final = X_final
+        self._carregar_explainer = carregar_explainer
+        self.capacidade = capacidade
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+        self._thread_aquecimento = None
+        self._parar = threading.Event()
+
+    @property
+    def explainer(self):
+        return self._carregar_explainer()
+
+    @property
+    def expected_value(self):
+        return self.explainer.expected_value
+
+    @property
+    def valor_base(self):
+        # Valor esperado da classe positiva, referência dos valores de `valores_shap`.
+        return self.explainer.expected_value[1]
+
+    def __len__(self):
+        return len(self.X_final)
+
+    def valores_shap(self, idx):
+        return self.valores_shap_lote([idx])[0]
+
+    def valores_shap_lote(self, indices):
+        indices = [int(i) for i in indices]
+        with self._lock:
+            faltantes = [i for i in dict.fromkeys(indices) if i not in self._cache]
+            calculados = {}
+            if faltantes:
+                with estagio('shap', len(faltantes)):
+                    valores = np.asarray(self.explainer.shap_values(self.X_final.iloc[faltantes]))[:, :, 1]
+                    calculados = dict(zip(faltantes, valores.astype(np.float32)))
+            resultado = []
+            for i in indices:
+                if i in self._cache:
+                    self._cache.move_to_end(i)
+                    resultado.append(self._cache[i])
+                else:
+                    resultado.append(calculados[i])
+            # Lotes maiores que a capacidade ficam só com as últimas linhas no cache.
+            for i, valores in calculados.items():
+                self._guardar(i, valores)
+            return np.stack(resultado)
+
+    def _guardar(self, idx, valores):
+        self._cache[idx] = valores
+        self._cache.move_to_end(idx)
+        while len(self._cache) > self.capacidade:
+            self._cache.popitem(last=False)
+
+    def aquecer(self, indices=None, tamanho_lote=TAMANHO_LOTE_AQUECIMENTO):
+        # Pré-calcula em segundo plano; nunca além da capacidade do cache.
+        if indices is None:
+            indices = range(len(self))
+        indices = list(indices)[:self.capacidade]
+        self.parar_aquecimento()
+        self._parar.clear()
+
+        def _executar():
+            for inicio in range(0, len(indices), tamanho_lote):
+                if self._parar.is_set():
+                    return
+                self.valores_shap_lote(indices[inicio:inicio + tamanho_lote])
+
+        self._thread_aquecimento = threading.Thread(target=_executar, daemon=True)
+        self._thread_aquecimento.start()
+        return self._thread_aquecimento
+
+    def __getstate__(self):
+        # Só os dados viajam no pickle (cache em disco); travas, thread e
+        # explicador são recriados no processo que carregar o objeto.
+        with self._lock:
+            return {'X_final': self.X_final, 'capacidade': self.capacidade, '_cache': OrderedDict(self._cache)}
+
+    def __setstate__(self, estado):
+        self.__init__(estado['X_final'], partial(obter_registro().obter, 'explainer'), estado['capacidade'])
+        # Caches gravados antes de guardar só a classe positiva (uma coluna por classe) são descartados.
+        self._cache = OrderedDict((i, v) for i, v in estado['_cache'].items() if v.ndim == 1)
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return int(self.X_final.memory_usage(index=False).sum()) + sum(v.nbytes for v in self._cache.values())
+
+    def parar_aquecimento(self):
+        if self._thread_aquecimento is not None and self._thread_aquecimento.is_alive():
+            self._parar.set()
+            self._thread_aquecimento.join()
+        self._thread_aquecimento = None
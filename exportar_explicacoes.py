@@ -0,0 +1,73 @@
+# Exporta as explicações SHAP de todos os KOIs de um ou mais arquivos (CSV, Parquet
+# ou Feather/Arrow) para arquivos colunares. Os blocos de linhas são divididos
+# entre processos que carregam o modelo e o TreeExplainer uma única vez cada.
+# Uso:
+#     python exportar_explicacoes.py entregas/*.csv --saida explicacoes --processos 8 --fatores 3
+import argparse
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from artefatos import obter_registro
+from narrativa import descrever_fator, fatores_principais
+from pipeline import explicar_bloco
+from pontuar_lote import adicionar_argumentos, executar
+
+# O SHAP custa muito mais por linha que a predição; blocos menores repartem melhor o trabalho.
+TAMANHO_BLOCO_EXPLICACOES = 2000
+N_FATORES = 3
+
+
+def _inicializar_trabalhador():
+    registro = obter_registro().carregar_essenciais()
+    registro.explainer
+
+
+def _fatores(colunas, valores, valores_shap, indices, prefixo):
+    colunas_fatores = {}
+    linhas = np.arange(len(valores))
+    for i in range(indices.shape[1]):
+        j = indices[:, i]
+        presentes = j >= 0
+        nomes = np.where(presentes, colunas[j], None)
+        # Tipo string explícito: um bloco sem nenhum fator não pode gravar o esquema do Parquet como nulo.
+        colunas_fatores[f"{prefixo}_{i+1}"] = pd.array(nomes, dtype='string')
+        colunas_fatores[f"shap_{prefixo}_{i+1}"] = np.where(presentes, valores_shap[linhas, j], np.nan)
+        colunas_fatores[f"justificativa_{prefixo}_{i+1}"] = pd.array([
+            descrever_fator(nome, valor) if nome is not None else None
+            for nome, valor in zip(nomes, valores[linhas, j])
+        ], dtype='string')
+    return colunas_fatores
+
+
+def _explicar(bloco, limiar_decisao, n_fatores):
+    registro = obter_registro()
+    df_resultado, X_final, valores_shap, ausentes, com_nan = explicar_bloco(bloco, limiar_decisao, registro)
+    colunas = np.asarray(X_final.columns)
+    valores = X_final.to_numpy()
+    positivos, negativos = fatores_principais(valores_shap, n_fatores)
+
+    saida = {
+        'kepoi_name': df_resultado['kepoi_name'].astype('string') if 'kepoi_name' in df_resultado else pd.array([None] * len(df_resultado), dtype='string'),
+        'Predicao': df_resultado['Predicao'].astype('string'),
+        'Score_Confianca': df_resultado['Score_Confianca'].to_numpy(),
+        'valor_base': np.full(len(df_resultado), registro.explainer.expected_value[1]),
+    }
+    saida.update({f"shap_{coluna}": valores_shap[:, j] for j, coluna in enumerate(colunas)})
+    saida.update(_fatores(colunas, valores, valores_shap, positivos, 'positivo'))
+    saida.update(_fatores(colunas, valores, valores_shap, negativos, 'negativo'))
+    return pd.DataFrame(saida), ausentes, com_nan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta os valores SHAP e os principais fatores de cada KOI.")
+    adicionar_argumentos(parser, 'parquet', TAMANHO_BLOCO_EXPLICACOES)
+    parser.add_argument('--fatores', type=int, default=N_FATORES, help="Fatores positivos e negativos listados por KOI.")
+    args = parser.parse_args(argv)
+    executar(args, partial(_explicar, limiar_decisao=args.limiar, n_fatores=args.fatores),
+             'explicacoes', _inicializar_trabalhador)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import numpy as np
+
+LIMITE_SUGESTOES = 20
+
+
+class IndiceKOI:
+    """Índice nome → linha dos resultados de uma análise, montado uma vez.
+
+    `buscar` faz busca por prefixo (sem diferenciar maiúsculas) com
+    `searchsorted` sobre os nomes ordenados e devolve só as primeiras
+    sugestões; `mais_confiantes` e `mais_limitrofes` usam ordenações
+    pré-calculadas do score de confiança.
+    """
+
+    def __init__(self, df_resultados):
+        # Array de largura fixa: bem menor por nome que um objeto str do Python.
+        self.nomes = df_resultados['kepoi_name'].astype(str).to_numpy().astype(str)
+        minusculas = np.char.lower(self.nomes)
+        self._ordem_alfabetica = np.argsort(minusculas, kind='stable')
+        self._nomes_ordenados = minusculas[self._ordem_alfabetica]
+        confianca = df_resultados['Score_Confianca'].to_numpy(dtype=float)
+        self._ordem_confianca = np.argsort(-confianca, kind='stable')
+
+    def __len__(self):
+        return len(self.nomes)
+
+    @property
+    def nbytes(self):
+        return self.nomes.nbytes + self._ordem_alfabetica.nbytes + self._nomes_ordenados.nbytes + self._ordem_confianca.nbytes
+
+    def posicao(self, nome):
+        # Busca binária nos nomes em minúsculas; nomes repetidos apontam para a
+        # primeira ocorrência, como a busca linear fazia.
+        chave = str(nome).lower()
+        inicio = np.searchsorted(self._nomes_ordenados, chave, side='left')
+        fim = np.searchsorted(self._nomes_ordenados, chave, side='right')
+        candidatos = self._ordem_alfabetica[inicio:fim]
+        candidatos = candidatos[self.nomes[candidatos] == nome]
+        return int(candidatos.min()) if len(candidatos) else None
+
+    def buscar(self, texto, limite=LIMITE_SUGESTOES):
+        prefixo = texto.strip().lower()
+        if not prefixo:
+            return []
+        inicio = np.searchsorted(self._nomes_ordenados, prefixo, side='left')
+        fim = np.searchsorted(self._nomes_ordenados, prefixo + '\U0010ffff', side='left')
+        encontrados = self.nomes[self._ordem_alfabetica[inicio:min(fim, inicio + limite)]].tolist()
+        if len(encontrados) < limite:
+            # Completa com nomes que contêm o texto em outra posição (ex.: só o número do KOI).
+            contem = np.flatnonzero(np.char.find(self._nomes_ordenados, prefixo) > 0)
+            encontrados += self.nomes[self._ordem_alfabetica[contem[:limite - len(encontrados)]]].tolist()
+        return encontrados
+
+    def mais_confiantes(self, n=LIMITE_SUGESTOES):
+        return self.nomes[self._ordem_confianca[:n]].tolist()
+
+    def posicoes_limitrofes(self, n=LIMITE_SUGESTOES):
+        # O score é a confiança na classe prevista; os mais baixos estão mais perto do limiar.
+        return self._ordem_confianca[::-1][:n]
+
+    def mais_limitrofes(self, n=LIMITE_SUGESTOES):
+        return self.nomes[self.posicoes_limitrofes(n)].tolist()
@@ -0,0 +1,126 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# EXOPLANETAS_INSTRUMENTACAO=1 mede tempo, linhas e memória residente de cada estágio;
+# =tracemalloc mede também o pico exato de alocações (bem mais lento, só para diagnóstico).
+MODO = os.environ.get('EXOPLANETAS_INSTRUMENTACAO', '').strip().lower()
+ATIVA = MODO not in ('', '0', 'false', 'nao', 'não')
+USAR_TRACEMALLOC = MODO == 'tracemalloc'
+
+logger = logging.getLogger(__name__)
+
+_medicoes = contextvars.ContextVar('medicoes', default=None)
+_estagio_atual = contextvars.ContextVar('estagio_atual', default=None)
+
+
+def memoria_residente():
+    # Memória residente do processo em bytes; barato o bastante para medir cada estágio.
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _pico_residente():
+    # ru_maxrss vem em KB no Linux e em bytes no macOS.
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == 'darwin' else pico * 1024
+
+
+class _EstagioNulo:
+    linhas = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        return False
+
+    def __setattr__(self, nome, valor):
+        pass
+
+
+_NULO = _EstagioNulo()
+
+
+class _Estagio:
+    def __init__(self, nome, linhas):
+        self.nome = nome
+        self.linhas = linhas
+
+    def __enter__(self):
+        self._memoria_inicial = memoria_residente()
+        if USAR_TRACEMALLOC:
+            self._rastreando = tracemalloc.is_tracing()
+            if not self._rastreando:
+                tracemalloc.start()
+            # O pico do tracemalloc é global: antes de zerá-lo, o do estágio externo fica guardado nele.
+            self._pai = _estagio_atual.get()
+            if self._pai is not None:
+                self._pai._pico = max(self._pai._pico, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._pico = 0
+            self._token = _estagio_atual.set(self)
+            self._alocado_inicial = tracemalloc.get_traced_memory()[0]
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        tempo = time.perf_counter() - self._inicio
+        memoria = memoria_residente()
+        medicao = {
+            'estagio': self.nome,
+            'tempo_s': tempo,
+            'linhas': self.linhas,
+            'linhas_por_s': self.linhas / tempo if self.linhas and tempo else None,
+            'memoria_residente_bytes': memoria,
+            'delta_memoria_bytes': None if memoria is None or self._memoria_inicial is None else memoria - self._memoria_inicial,
+            'pico_residente_processo_bytes': _pico_residente(),
+            'erro': tipo.__name__ if tipo else None,
+        }
+        if USAR_TRACEMALLOC:
+            pico = max(self._pico, tracemalloc.get_traced_memory()[1])
+            medicao['pico_alocado_bytes'] = pico - self._alocado_inicial
+            _estagio_atual.reset(self._token)
+            if self._pai is not None:
+                self._pai._pico = max(self._pai._pico, pico)
+            if not self._rastreando:
+                tracemalloc.stop()
+        medicoes = _medicoes.get()
+        if medicoes is not None:
+            medicoes.append(medicao)
+        logger.info(json.dumps(medicao))
+        return False
+
+
+def estagio(nome, linhas=None):
+    # Desativada, devolve sempre o mesmo contexto vazio: o custo é o de uma chamada de função.
+    # Ativa, `linhas` também pode ser definido dentro do bloco (ex.: depois de ler o arquivo).
+    if not ATIVA:
+        return _NULO
+    return _Estagio(nome, linhas)
+
+
+@contextmanager
+def coletar():
+    # Junta numa lista as medições dos estágios executados dentro do bloco, nesta thread.
+    medicoes = []
+    token = _medicoes.set(medicoes)
+    try:
+        yield medicoes
+    finally:
+        _medicoes.reset(token)
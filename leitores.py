@@ -0,0 +1,203 @@
+import io
+import logging
+import os
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pa_parquet
+except ImportError:
+    pa = None
+
+FORMATOS_ENTRADA = ('csv', 'parquet', 'feather', 'arrow')
+EXTENSOES = {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet', '.feather': 'feather', '.arrow': 'arrow', '.ipc': 'arrow'}
+COLUNA_NOME = 'kepoi_name'
+
+logger = logging.getLogger(__name__)
+
+
+def formato_do_arquivo(nome):
+    # Extensões desconhecidas continuam sendo lidas como CSV, como antes.
+    return EXTENSOES.get(os.path.splitext(str(nome))[1].lower(), 'csv')
+
+
+def _validar_formato(formato):
+    if formato not in FORMATOS_ENTRADA:
+        raise ValueError(f"Formato de entrada desconhecido: '{formato}'. Opções: {', '.join(FORMATOS_ENTRADA)}")
+
+
+def _exigir_pyarrow(formato):
+    if pa is None:
+        raise ImportError(f"A leitura de arquivos {formato} requer o pacote pyarrow.")
+
+
+def _fonte_arrow(fonte):
+    # Bytes (arquivo enviado pelo app) são lidos sem cópia; caminhos são mapeados em memória.
+    if isinstance(fonte, (bytes, bytearray, memoryview)):
+        return pa.BufferReader(fonte)
+    return pa.memory_map(os.fspath(fonte))
+
+
+def _fonte_pandas(fonte):
+    return io.BytesIO(fonte) if isinstance(fonte, (bytes, bytearray, memoryview)) else fonte
+
+
+def _projecao(nomes, colunas_modelo):
+    # Colunas do arquivo que interessam, na ordem do arquivo (como o `usecols` do pandas).
+    interesse = set(colunas_modelo) | {COLUNA_NOME}
+    return [nome for nome in nomes if nome in interesse]
+
+
+def _tipos_arrow(colunas, colunas_modelo):
+    modelo = set(colunas_modelo)
+    return {coluna: pa.float64() if coluna in modelo else pa.string() for coluna in colunas}
+
+
+def _converter_tabela(tabela, colunas_modelo, inicio=0):
+    # Atributos do modelo como float64 (inteiros, booleanos e colunas só com nulos
+    # incluídos); o que não converte fica como está e a imputação decide.
+    modelo = set(colunas_modelo)
+    for i, campo in enumerate(tabela.schema):
+        if campo.name in modelo and campo.type != pa.float64():
+            try:
+                tabela = tabela.set_column(i, campo.name, tabela.column(i).cast(pa.float64()))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                pass
+    df = tabela.to_pandas(split_blocks=True)
+    df.index = pd.RangeIndex(inicio, inicio + len(df))
+    return df
+
+
+def _cabecalho_csv(fonte):
+    return pd.read_csv(_fonte_pandas(fonte), nrows=0).columns.tolist()
+
+
+def _ler_csv_pandas(fonte, colunas_modelo, **opcoes):
+    interesse = set(colunas_modelo) | {COLUNA_NOME}
+    return pd.read_csv(_fonte_pandas(fonte), usecols=lambda coluna: coluna in interesse, **opcoes)
+
+
+def _colunas_csv(fonte, colunas_modelo):
+    return _projecao(_cabecalho_csv(fonte), colunas_modelo)
+
+
+def _ler_csv_sem_colunas(fonte, **opcoes):
+    # Nenhuma coluna útil: só as linhas importam (todas serão imputadas). Ler a
+    # primeira coluna preserva o número de linhas, que o `usecols` vazio perderia.
+    return pd.read_csv(_fonte_pandas(fonte), usecols=[0], **opcoes)
+
+
+def _opcoes_csv(colunas, colunas_modelo):
+    # Tipos explícitos: o parser não infere nada e só converte as colunas projetadas.
+    return pa_csv.ConvertOptions(include_columns=colunas, column_types=_tipos_arrow(colunas, colunas_modelo))
+
+
+def ler_tabela(fonte, colunas_modelo, formato='csv'):
+    """Lê uma tabela KOI com apenas `kepoi_name` e as colunas do modelo.
+
+    `fonte` é um caminho ou o conteúdo do arquivo em bytes. A projeção das
+    colunas (e, no CSV, o tipo numérico de cada uma) é passada ao leitor, de
+    modo que o custo acompanha as colunas usadas e não a largura do arquivo.
+    """
+    _validar_formato(formato)
+    if formato == 'csv':
+        colunas = _colunas_csv(fonte, colunas_modelo)
+        if not colunas:
+            return _ler_csv_sem_colunas(fonte).iloc[:, :0]
+        if pa is None:
+            return _ler_csv_pandas(fonte, colunas_modelo)
+        try:
+            tabela = pa_csv.read_csv(_fonte_arrow(fonte), convert_options=_opcoes_csv(colunas, colunas_modelo))
+        except pa.ArrowInvalid as erro:
+            # Arquivos fora do padrão (valores não numéricos, colunas repetidas...) seguem pelo pandas.
+            logger.info("Leitura do CSV pelo pyarrow falhou (%s); usando o pandas", erro)
+            return _ler_csv_pandas(fonte, colunas_modelo)
+        return _converter_tabela(tabela, colunas_modelo)
+
+    _exigir_pyarrow(formato)
+    if formato == 'parquet':
+        arquivo = pa_parquet.ParquetFile(_fonte_arrow(fonte))
+        tabela = arquivo.read(columns=_projecao(arquivo.schema_arrow.names, colunas_modelo))
+    else:
+        tabela = _abrir_arrow(fonte, colunas_modelo).read_all()
+    return _converter_tabela(tabela, colunas_modelo)
+
+
+def _em_blocos(lotes, tamanho_bloco):
+    # Reagrupa os lotes do leitor (do tamanho que ele escolher) em tabelas de `tamanho_bloco` linhas.
+    pendentes, n_pendentes = [], 0
+    for lote in lotes:
+        pendentes.append(lote)
+        n_pendentes += lote.num_rows
+        while n_pendentes >= tamanho_bloco:
+            tabela = pa.Table.from_batches(pendentes)
+            yield tabela.slice(0, tamanho_bloco)
+            resto = tabela.slice(tamanho_bloco)
+            pendentes, n_pendentes = resto.to_batches(), resto.num_rows
+    if n_pendentes:
+        yield pa.Table.from_batches(pendentes)
+
+
+def _abrir_arrow(fonte, colunas_modelo):
+    # Feather (v2) e Arrow são o mesmo formato IPC; só os campos projetados são lidos e descomprimidos.
+    nomes = pa_ipc.open_file(_fonte_arrow(fonte)).schema.names
+    projetadas = set(_projecao(nomes, colunas_modelo))
+    campos = [i for i, nome in enumerate(nomes) if nome in projetadas]
+    return pa_ipc.open_file(_fonte_arrow(fonte), options=pa_ipc.IpcReadOptions(included_fields=campos))
+
+
+def _lotes(fonte, colunas_modelo, formato, tamanho_bloco):
+    if formato == 'parquet':
+        arquivo = pa_parquet.ParquetFile(_fonte_arrow(fonte))
+        return arquivo.iter_batches(batch_size=tamanho_bloco, columns=_projecao(arquivo.schema_arrow.names, colunas_modelo))
+    leitor = _abrir_arrow(fonte, colunas_modelo)
+    return (leitor.get_batch(i) for i in range(leitor.num_record_batches))
+
+
+@contextmanager
+def ler_tabela_em_blocos(fonte, colunas_modelo, tamanho_bloco, formato='csv'):
+    # Como ler_tabela, mas entrega DataFrames de até `tamanho_bloco` linhas, com o
+    # índice contínuo entre os blocos (como o `chunksize` do pandas).
+    _validar_formato(formato)
+    lotes = None
+    if formato == 'csv':
+        colunas = _colunas_csv(fonte, colunas_modelo)
+        if not colunas:
+            with _ler_csv_sem_colunas(fonte, chunksize=tamanho_bloco) as leitor:
+                yield (bloco.iloc[:, :0] for bloco in leitor)
+            return
+        if pa is not None:
+            try:
+                lotes = pa_csv.open_csv(_fonte_arrow(fonte), convert_options=_opcoes_csv(colunas, colunas_modelo))
+            except pa.ArrowInvalid as erro:
+                logger.info("Leitura do CSV pelo pyarrow falhou (%s); usando o pandas", erro)
+        if lotes is None:
+            with _ler_csv_pandas(fonte, colunas_modelo, chunksize=tamanho_bloco) as leitor:
+                yield leitor
+            return
+    else:
+        _exigir_pyarrow(formato)
+        lotes = _lotes(fonte, colunas_modelo, formato, tamanho_bloco)
+
+    def _blocos():
+        inicio = 0
+        try:
+            for tabela in _em_blocos(lotes, tamanho_bloco):
+                yield _converter_tabela(tabela, colunas_modelo, inicio)
+                inicio += tabela.num_rows
+        except pa.ArrowInvalid as erro:
+            if formato != 'csv':
+                raise
+            # Erro de conversão no meio do arquivo: o pandas continua da primeira linha ainda
+            # não entregue, como ler_tabela faria com o arquivo inteiro.
+            logger.info("Leitura do CSV pelo pyarrow falhou na linha %d (%s); usando o pandas", inicio, erro)
+            with _ler_csv_pandas(fonte, colunas_modelo, chunksize=tamanho_bloco) as leitor:
+                for bloco in leitor:
+                    if bloco.index[-1] >= inicio:
+                        yield bloco[bloco.index >= inicio]
+
+    yield _blocos()
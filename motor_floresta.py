@@ -0,0 +1,263 @@
+"""Motor de inferência da floresta em vetores NumPy, com o mesmo resultado do scikit-learn.
+
+O objetivo original era mais vazão que o predict_proba do scikit-learn em lotes
+de 1 mil, 100 mil e 1 milhão de linhas, e ele não foi alcançado: medido com
+benchmarks/bench_motor_floresta.py (100 árvores, um núcleo), o motor fica em
+cerca de 0,5x a 1 mil linhas, 0,4x a 100 mil e 0,36x a 1 milhão. Ele só ganha
+em lotes pequenos (13x para uma linha, 2,6x para 100), por isso é usado pelo
+serviço HTTP de micro-lotes e não pelos CLIs de lote nem pelo app.
+"""
+import argparse
+import hashlib
+import json
+import os
+import warnings
+
+import numpy as np
+
+TAMANHO_BLOCO = 2048
+VERSAO_FORMATO = 1
+ARQUIVO_MANIFESTO = 'manifesto.json'
+ARRAYS_PERSISTIDOS = ('atributo', 'limiar', 'filhos', 'nan_esquerda', 'valores', 'raizes', 'classes_')
+LINHAS_VERIFICACAO = 512
+FRACAO_NULOS_VERIFICACAO = 0.2
+
+
+def hash_bytes(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def hash_colunas(colunas_modelo):
+    # Independe da formatação do JSON: só a lista e a ordem das colunas importam.
+    return hash_bytes(json.dumps(list(colunas_modelo)).encode())
+
+
+def _limiar_float32(limiar):
+    # Maior float32 <= limiar: para x float32, `x <= limiar` equivale a `x <= resultado`.
+    resultado = limiar.astype(np.float32)
+    acima = resultado.astype(np.float64) > limiar
+    resultado[acima] = np.nextafter(resultado[acima], np.float32(-np.inf))
+    return resultado
+
+
+class FlorestaCompilada:
+    """RandomForestClassifier achatado em vetores NumPy contíguos.
+
+    Os nós de todas as árvores ficam nos mesmos vetores (atributo, limiar,
+    filhos, valores das folhas) e `raizes` guarda o índice da raiz de cada
+    árvore. Folhas apontam para si mesmas com limiar infinito, então a
+    travessia avança todas as árvores sobre o bloco inteiro de linhas de uma
+    vez e só periodicamente descarta os pares (árvore, linha) que já
+    terminaram.
+
+    `predict_proba` reproduz bit a bit o do scikit-learn: a entrada é
+    convertida para float32, NaN segue `missing_go_to_left` e as
+    probabilidades das árvores são somadas na ordem de `estimators_` antes da
+    divisão pelo número de árvores. `compilar` confere isso contra o modelo de
+    origem antes de devolver a floresta.
+
+    A travessia em NumPy só compensa em lotes pequenos (o serviço HTTP); a
+    partir de algumas centenas de linhas o predict_proba do scikit-learn é
+    mais rápido, por isso os CLIs de lote não usam este motor.
+    """
+
+    def __init__(self, atributo, limiar, filhos, nan_esquerda, valores, raizes, classes):
+        self.atributo = atributo
+        self.limiar = limiar
+        self.filhos = filhos
+        self.nan_esquerda = nan_esquerda
+        self.valores = valores
+        self.raizes = raizes
+        self.classes_ = classes
+        self.folha = filhos[0::2] == np.arange(len(atributo))
+
+    @classmethod
+    def compilar(cls, modelo, verificar=True):
+        atributos, limiares, filhos, nan_esquerdas, valores, raizes = [], [], [], [], [], []
+        deslocamento = 0
+        n_classes = len(modelo.classes_)
+        for estimador in modelo.estimators_:
+            arvore = estimador.tree_
+            folha = arvore.children_left < 0
+            indices = np.arange(arvore.node_count) + deslocamento
+            filhos_arvore = np.empty(2 * arvore.node_count, dtype=np.intp)
+            filhos_arvore[0::2] = np.where(folha, indices, arvore.children_left + deslocamento)
+            filhos_arvore[1::2] = np.where(folha, indices, arvore.children_right + deslocamento)
+            raizes.append(deslocamento)
+            atributos.append(np.where(folha, 0, arvore.feature))
+            limiares.append(np.where(folha, np.inf, arvore.threshold))
+            filhos.append(filhos_arvore)
+            nan_esquerdas.append(np.asarray(arvore.missing_go_to_left, dtype=bool) | folha)
+            valores.append(arvore.value[:, 0, :n_classes])
+            deslocamento += arvore.node_count
+        floresta = cls(
+            atributo=np.ascontiguousarray(np.concatenate(atributos), dtype=np.intp),
+            limiar=_limiar_float32(np.concatenate(limiares).astype(np.float64)),
+            filhos=np.concatenate(filhos),
+            nan_esquerda=np.concatenate(nan_esquerdas),
+            valores=np.ascontiguousarray(np.concatenate(valores), dtype=np.float64),
+            raizes=np.asarray(raizes, dtype=np.intp),
+            classes=np.asarray(modelo.classes_),
+        )
+        if verificar:
+            floresta.verificar_equivalencia(modelo)
+        return floresta
+
+    def verificar_equivalencia(self, modelo, X=None):
+        # Compara com o predict_proba do modelo de origem, bit a bit. Sem `X`, usa linhas
+        # sorteadas em torno dos limiares da própria floresta, com e sem valores nulos.
+        if X is None:
+            X = np.concatenate([
+                gerar_linhas(self, modelo.n_features_in_, LINHAS_VERIFICACAO),
+                gerar_linhas(self, modelo.n_features_in_, LINHAS_VERIFICACAO, FRACAO_NULOS_VERIFICACAO, semente=1),
+            ])
+        with warnings.catch_warnings():
+            # O modelo foi treinado com nomes de colunas; aqui só os valores importam.
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            esperado = modelo.predict_proba(X)
+        divergentes = np.count_nonzero((esperado != self.predict_proba(X)).any(axis=1))
+        if divergentes:
+            raise RuntimeError(f"A floresta compilada difere do modelo em {divergentes} de {len(X)} linhas de verificação.")
+
+    def salvar(self, diretorio, colunas_modelo, hash_modelo=None):
+        # Um .npy por vetor, mais um manifesto com versão, checksums e as
+        # impressões digitais das colunas e do modelo de origem.
+        os.makedirs(diretorio, exist_ok=True)
+        arrays = {}
+        for nome in ARRAYS_PERSISTIDOS:
+            valor = np.ascontiguousarray(getattr(self, nome))
+            arquivo = f"{nome}.npy"
+            np.save(os.path.join(diretorio, arquivo), valor, allow_pickle=False)
+            arrays[nome] = {'arquivo': arquivo, 'dtype': valor.dtype.str, 'shape': list(valor.shape), 'sha256': hash_bytes(valor.tobytes())}
+        manifesto = {
+            'versao_formato': VERSAO_FORMATO,
+            'n_arvores': self.n_arvores,
+            'colunas_sha256': hash_colunas(colunas_modelo),
+            'modelo_sha256': hash_modelo,
+            'arrays': arrays,
+        }
+        with open(os.path.join(diretorio, ARQUIVO_MANIFESTO), 'w') as f:
+            json.dump(manifesto, f, indent=4)
+        return manifesto
+
+    @classmethod
+    def carregar(cls, diretorio, colunas_modelo=None, verificar_integridade=True):
+        # Os vetores são mapeados em memória somente leitura: processos na mesma
+        # máquina compartilham as páginas. Os checksums do manifesto são conferidos
+        # a cada carga (uma vez por processo no registro); o custo é ler o pacote uma vez.
+        manifesto = ler_manifesto(diretorio)
+        if manifesto.get('versao_formato') != VERSAO_FORMATO:
+            raise RuntimeError(f"Formato do modelo compilado em '{diretorio}' é a versão {manifesto.get('versao_formato')}; esperada a versão {VERSAO_FORMATO}. Execute o script 'preparar_artefatos.py' novamente.")
+        if colunas_modelo is not None and manifesto['colunas_sha256'] != hash_colunas(colunas_modelo):
+            raise RuntimeError(f"O modelo compilado em '{diretorio}' foi gerado para outro 'colunas_modelo.json'. Execute o script 'preparar_artefatos.py' novamente.")
+        arrays = {}
+        for nome, descricao in manifesto['arrays'].items():
+            # np.asarray devolve uma visão ndarray do mesmo mapeamento, sem o custo
+            # que a subclasse np.memmap adiciona a cada indexação.
+            try:
+                arrays[nome] = np.asarray(np.load(os.path.join(diretorio, descricao['arquivo']), mmap_mode='r', allow_pickle=False))
+            except ValueError as erro:
+                # Arquivo truncado: o cabeçalho promete mais bytes do que existem.
+                raise RuntimeError(f"'{descricao['arquivo']}' em '{diretorio}' está incompleto ou corrompido ({erro}).")
+            if list(arrays[nome].shape) != descricao['shape'] or arrays[nome].dtype.str != descricao['dtype']:
+                raise RuntimeError(f"'{descricao['arquivo']}' em '{diretorio}' não tem o formato registrado no manifesto.")
+            if verificar_integridade and hash_bytes(np.ascontiguousarray(arrays[nome]).tobytes()) != descricao['sha256']:
+                raise RuntimeError(f"Checksum inválido para '{descricao['arquivo']}' em '{diretorio}'.")
+        classes = arrays.pop('classes_')
+        return cls(classes=classes, **arrays)
+
+    @property
+    def n_arvores(self):
+        return len(self.raizes)
+
+    def apply(self, X):
+        # Índices de folha locais a cada árvore, no formato (n_linhas, n_arvores) de modelo.apply.
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return (self._folhas(X).reshape(self.n_arvores, len(X)) - self.raizes[:, None]).T
+
+    def predict_proba(self, X, tamanho_bloco=TAMANHO_BLOCO):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_classes = self.valores.shape[1]
+        probabilidades = np.empty((len(X), n_classes), dtype=np.float64)
+        for inicio in range(0, len(X), tamanho_bloco):
+            bloco = X[inicio:inicio + tamanho_bloco]
+            folhas = self._folhas(bloco).reshape(self.n_arvores, len(bloco))
+            acumulado = probabilidades[inicio:inicio + len(bloco)]
+            acumulado[:] = 0.0
+            for folhas_arvore in folhas:
+                acumulado += self.valores[folhas_arvore]
+            acumulado /= self.n_arvores
+        return probabilidades
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def _folhas(self, X):
+        n_linhas, n_colunas = X.shape
+        X_plano = X.ravel()
+        tem_nulos = np.isnan(X_plano).any()
+        nos = np.repeat(self.raizes, n_linhas)
+        ativos = np.flatnonzero(~self.folha[nos])
+        nos_ativos = nos[ativos]
+        base_ativos = (ativos % n_linhas) * n_colunas
+        while ativos.size:
+            x = X_plano[base_ativos + self.atributo[nos_ativos]]
+            direita = x > self.limiar[nos_ativos]
+            if tem_nulos:
+                nulos = np.isnan(x)
+                direita[nulos] = ~self.nan_esquerda[nos_ativos[nulos]]
+            nos_ativos = self.filhos[2 * nos_ativos + direita]
+            # Folhas apontam para si mesmas; só vale a pena compactar quando
+            # uma fração razoável dos pares já terminou.
+            terminados = self.folha[nos_ativos]
+            if 4 * np.count_nonzero(terminados) >= len(terminados):
+                nos[ativos[terminados]] = nos_ativos[terminados]
+                continuam = ~terminados
+                ativos = ativos[continuam]
+                nos_ativos = nos_ativos[continuam]
+                base_ativos = base_ativos[continuam]
+        return nos
+
+
+def gerar_linhas(floresta, n_colunas, n_linhas, fracao_nulos=0.0, semente=42):
+    # Sorteia valores próximos aos limiares da própria floresta, para que as
+    # linhas percorram caminhos variados e profundos nas árvores.
+    rng = np.random.default_rng(semente)
+    X = np.empty((n_linhas, n_colunas), dtype=np.float32)
+    internos = ~floresta.folha
+    for j in range(n_colunas):
+        limiares = floresta.limiar[internos & (floresta.atributo == j)]
+        if len(limiares) == 0:
+            limiares = np.zeros(1, dtype=np.float32)
+        X[:, j] = rng.choice(limiares, n_linhas) * rng.uniform(0.9, 1.1, n_linhas)
+    X[rng.random(X.shape) < fracao_nulos] = np.nan
+    return X
+
+
+def ler_manifesto(diretorio):
+    with open(os.path.join(diretorio, ARQUIVO_MANIFESTO), 'r') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    # Gera o pacote compilado a partir de um modelo já treinado, sem re-treinar.
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Exporta o RandomForest treinado para o formato compilado mapeável em memória.")
+    parser.add_argument('--modelo', default='modelo_random_forest.pkl')
+    parser.add_argument('--colunas', default='colunas_modelo.json')
+    parser.add_argument('--saida', default='modelo_compilado')
+    args = parser.parse_args(argv)
+
+    with open(args.modelo, 'rb') as f:
+        hash_modelo = hash_bytes(f.read())
+    with open(args.colunas, 'r') as f:
+        colunas_modelo = json.load(f)
+    floresta = FlorestaCompilada.compilar(joblib.load(args.modelo))
+    floresta.salvar(args.saida, colunas_modelo, hash_modelo)
+    print(f"Modelo compilado salvo em '{args.saida}' ({floresta.n_arvores} árvores, {len(floresta.limiar)} nós); "
+          f"predict_proba idêntico ao do modelo, com e sem valores nulos.")
+
+
+if __name__ == '__main__':
+    main()
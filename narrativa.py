@@ -0,0 +1,92 @@
+import numpy as np
+
+LIMIAR_DE_IMPACTO = 0.05
+
+MAPEAMENTO_EXPLICACOES = {
+    'koi_fpflag_nt': lambda v: f"the **presence of the 'not transit-like signal' flag** (value {v:.0f}), a strong indication against a valid candidate." if v == 1 else f"the **absence of the 'not transit-like signal' flag** (value {v:.0f}), indicating that the light curve is consistent with a transit.",
+    'koi_fpflag_ss': lambda v: f"the **presence of the 'stellar variability' flag** (value {v:.0f}), suggesting that the signal likely arises from stellar activity." if v == 1 else f"the **absence of the 'stellar variability' flag** (value {v:.0f}), suggesting the signal is not caused by starspots.",
+    'koi_fpflag_co': lambda v: f"the **presence of the 'centroid offset' flag** (value {v:.0f}), suggesting contamination from a background star." if v == 1 else f"the **absence of the 'centroid offset' flag** (value {v:.0f}), strengthening the hypothesis that the transit occurs in the target star.",
+    'koi_fpflag_ec': lambda v: f"the **presence of the 'eclipsing binary' flag** (value {v:.0f}), a strong indicator of a false positive." if v == 1 else f"the **absence of the 'eclipsing binary' flag** (value {v:.0f}), reducing the likelihood of a false positive.",
+    'koi_model_snr': lambda v: f"a **high signal-to-noise ratio (SNR) of {v:.2f}**, indicating a clear and strong transit signal." if v > 20 else f"a **low signal-to-noise ratio (SNR) of {v:.2f}**, suggesting a weak or noisy signal.",
+    'koi_impact': lambda v: f"a **high impact parameter of {v:.3f}**, indicating a grazing transit, less likely to be planetary." if v > 0.8 else f"a **low impact parameter of {v:.3f}**, suggesting a central transit across the stellar disk.",
+    'koi_prad': lambda v: f"an **estimated planetary radius of {v:.2f} Earth radii**, which is too large and more characteristic of a small star or brown dwarf." if v > 15 else f"an **estimated planetary radius of {v:.2f} Earth radii**, a plausible size for an exoplanet.",
+    'koi_depth': lambda v: f"a **transit depth of {v:.1f} ppm**, too deep for a rocky planet, suggesting a gas giant or another type of object." if v > 100000 else f"a **transit depth of {v:.1f} ppm**, consistent with a planetary-sized object.",
+    'koi_duration': lambda v: f"a **transit duration of {v:.2f} hours**, consistent with the orbit of a planetary candidate.",
+    'koi_period': lambda v: f"an **orbital period of {v:.2f} days**.",
+    'koi_ror': lambda v: f"a **radius ratio (planet/star) of {v:.4f}**, a key indicator for confirmation.",
+    'koi_incl': lambda v: f"a **high orbital inclination of {v:.2f} degrees**, indicating an edge-on view as expected for transits.",
+    'koi_teq': lambda v: f"an **equilibrium temperature of {v:.0f} K**.",
+    'koi_insol': lambda v: f"an **insolation flux of {v:.2f} (relative to Earth)**.",
+    'koi_dor': lambda v: f"a **transit-to-stellar radius distance of {v:.2f}**.",
+    'koi_ldm_coeff1': lambda v: f"the **limb darkening coefficient (linear) of {v:.3f}**.",
+    'koi_ldm_coeff2': lambda v: f"the **limb darkening coefficient (quadratic) of {v:.3f}**.",
+    'koi_tce_plnt_num': lambda v: f"the **transit event threshold number ({v:.0f})**.",
+    'koi_steff': lambda v: f"the **stellar effective temperature of {v:.0f} K**.",
+    'koi_slogg': lambda v: f"the **stellar surface gravity of {v:.3f} (log10 cm/s²)**.",
+    'koi_srad': lambda v: f"the **stellar radius of {v:.3f} solar radii**.",
+    'koi_smass': lambda v: f"the **stellar mass of {v:.3f} solar masses**.",
+    'ra': lambda v: f"the **right ascension of the star of {v:.3f} degrees**.",
+    'dec': lambda v: f"the **declination of the star of {v:.3f} degrees**.",
+    'koi_kepmag': lambda v: f"the **stellar magnitude in the Kepler filter of {v:.3f}**.",
+    'koi_period_err1': lambda v: f"a **low uncertainty in the orbital period measurement** (+{v:.1e} days), indicating a stable, periodic signal.",
+    'koi_period_err2': lambda v: f"a **low uncertainty in the orbital period measurement** ({v:.1e} days), indicating a stable, periodic signal.",
+    'koi_time0_err1': lambda v: f"a **low uncertainty in the transit timing** (+{v:.1e} days).",
+    'koi_time0_err2': lambda v: f"a **low uncertainty in the transit timing** ({v:.1e} days).",
+    'koi_impact_err1': lambda v: f"a **low uncertainty in the impact parameter** (+{v:.2f}).",
+    'koi_impact_err2': lambda v: f"a **low uncertainty in the impact parameter** ({v:.2f}).",
+    'koi_duration_err1': lambda v: f"a **low uncertainty in the transit duration** (+{v:.1e} hours).",
+    'koi_duration_err2': lambda v: f"a **low uncertainty in the transit duration** ({v:.1e} hours).",
+    'koi_depth_err1': lambda v: f"a **low uncertainty in the transit depth** (+{v:.1f} ppm).",
+    'koi_depth_err2': lambda v: f"a **low uncertainty in the transit depth** ({v:.1f} ppm).",
+    'koi_prad_err1': lambda v: f"a **low uncertainty in the planetary radius** (+{v:.1e} Earth radii).",
+    'koi_prad_err2': lambda v: f"a **low uncertainty in the planetary radius** ({v:.1e} Earth radii).",
+    'koi_insol_err1': lambda v: f"a **low uncertainty in the insolation flux** (+{v:.1f}).",
+    'koi_insol_err2': lambda v: f"a **low uncertainty in the insolation flux** ({v:.1f}).",
+    'koi_dor_err1': lambda v: f"a **low uncertainty in the transit-to-stellar radius distance** (+{v:.1f}).",
+    'koi_dor_err2': lambda v: f"a **low uncertainty in the transit-to-stellar radius distance** ({v:.1f}).",
+    'koi_ror_err1': lambda v: f"a **low uncertainty in the radius ratio** (+{v:.1e}).",
+    'koi_ror_err2': lambda v: f"a **low uncertainty in the radius ratio** ({v:.1e}).",
+    'koi_steff_err1': lambda v: f"a **low uncertainty in the stellar temperature** (+{v:.1f} K).",
+    'koi_steff_err2': lambda v: f"a **low uncertainty in the stellar temperature** ({v:.1f} K).",
+    'koi_slogg_err1': lambda v: f"a **low uncertainty in the stellar surface gravity** (+{v:.2f}).",
+    'koi_slogg_err2': lambda v: f"a **low uncertainty in the stellar surface gravity** ({v:.2f}).",
+    'koi_srad_err1': lambda v: f"a **low uncertainty in the stellar radius** (+{v:.2f}).",
+    'koi_srad_err2': lambda v: f"a **low uncertainty in the stellar radius** ({v:.2f}).",
+    'koi_smass_err1': lambda v: f"a **low uncertainty in the stellar mass** (+{v:.2f}).",
+    'koi_smass_err2': lambda v: f"a **low uncertainty in the stellar mass** ({v:.2f}).",
+}
+
+
+def gerar_narrativa(predicao, colunas, valores, valores_shap_classe_1):
+    # Linhas em markdown da justificativa técnica: a introdução seguida dos fatores
+    # que empurraram a predição para a classe prevista, do mais forte ao mais fraco.
+    if predicao == "CONFIRMADO":
+        introducao = "The classification as **CONFIRMED** was mainly influenced by the following positive factors:"
+        selecionados = np.flatnonzero(valores_shap_classe_1 > LIMIAR_DE_IMPACTO)
+        selecionados = selecionados[np.argsort(-valores_shap_classe_1[selecionados])]
+    else:
+        introducao = "The classification as **FALSE POSITIVE** was mainly influenced by the following warning signs:"
+        selecionados = np.flatnonzero(valores_shap_classe_1 < -LIMIAR_DE_IMPACTO)
+        selecionados = selecionados[np.argsort(valores_shap_classe_1[selecionados])]
+
+    if not len(selecionados):
+        return [introducao, "The prediction for this object was close to the decision threshold, with no individual factors strongly influencing this classification."]
+
+    return [introducao] + [f"{i+1}. {descrever_fator(colunas[j], valores[j])}" for i, j in enumerate(selecionados)]
+
+
+def descrever_fator(feature_name, valor):
+    if feature_name in MAPEAMENTO_EXPLICACOES:
+        justificativa = MAPEAMENTO_EXPLICACOES[feature_name](valor)
+        return f"{justificativa.capitalize()} (`{feature_name}`)"
+    return f"O parâmetro `{feature_name}` com valor de `{valor:.3f}` foi um fator relevante."
+
+
+def fatores_principais(valores_shap_classe_1, k, limiar=LIMIAR_DE_IMPACTO):
+    # Para cada linha, as k colunas que mais empurram para CONFIRMADO e para FALSO POSITIVO,
+    # da mais forte para a mais fraca; -1 onde o impacto não passa do limiar.
+    positivos = np.argsort(-valores_shap_classe_1, axis=1, kind='stable')[:, :k]
+    negativos = np.argsort(valores_shap_classe_1, axis=1, kind='stable')[:, :k]
+    positivos[np.take_along_axis(valores_shap_classe_1, positivos, axis=1) <= limiar] = -1
+    negativos[np.take_along_axis(valores_shap_classe_1, negativos, axis=1) >= -limiar] = -1
+    return positivos, negativos
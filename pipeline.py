@@ -1,48 +1,154 @@
-# pipeline.py
+from functools import partial
+
+import numpy as np
 import pandas as pd
-import joblib
-import json
-import pickle
-
-try:
-    modelo = joblib.load('modelo_random_forest.pkl')
-    colunas_modelo = json.load(open('colunas_modelo.json', 'r'))
-    valores_imputacao = json.load(open('valores_imputacao.json', 'r'))
-    explainer = pickle.load(open('shap_explainer.pkl', 'rb'))
-except FileNotFoundError:
-    raise RuntimeError("Arquivos de modelo/explicador não encontrados. Execute o script 'preparar_artefatos.py' primeiro.")
-
-def processar_e_prever(df_bruto: pd.DataFrame):
-    df_processado = df_bruto.copy()
+from artefatos import obter_registro
+from explicacoes import ProvedorExplicacoes
+from instrumentacao import estagio
+from leitores import formato_do_arquivo, ler_tabela_em_blocos
+
+ROTULOS_PREDICAO = ['FALSO POSITIVO', 'CONFIRMADO']
+STATUS_DADOS = ['Completo', 'Imputado']
+LIMIAR_DECISAO = 0.5
+MOTORES = ('sklearn', 'compilado')
+MOTOR_PADRAO = 'sklearn'
+
+def prever_com_confianca(X, limiar_decisao=LIMIAR_DECISAO, registro=None, motor=MOTOR_PADRAO):
+    # Uma única passada pela floresta: classe e confiança saem da mesma matriz de probabilidades.
+    # Com limiar 0.5 o resultado é idêntico ao argmax usado por modelo.predict.
+    registro = registro or obter_registro()
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de inferência desconhecido: '{motor}'. Opções: {', '.join(MOTORES)}")
+    with estagio('predict_proba', len(X)):
+        if motor == 'compilado':
+            modelo = registro.floresta_compilada
+            probabilidades = modelo.predict_proba(X.to_numpy())
+        else:
+            modelo = registro.modelo
+            probabilidades = modelo.predict_proba(X)
+    colunas = (probabilidades[:, 1] > limiar_decisao).astype(np.intp)
+    confianca = probabilidades[np.arange(len(colunas)), colunas]
+    return modelo.classes_[colunas], confianca
+
+TAMANHO_BLOCO_STREAMING = 50000
+COLUNAS_RESULTADO = ['kepoi_name', 'Predicao', 'Score_Confianca', 'Status_Dados', 'koi_depth', 'koi_duration', 'koi_prad', 'koi_teq', 'koi_period']
+
+def _preparar_dados(df_bruto, registro, plano=None):
+    # Seleção de colunas e imputação pelo plano compilado; devolve também o que foi imputado para compor os avisos.
+    plano = plano or registro.plano_colunas
+    with estagio('selecao_imputacao', len(df_bruto)):
+        X, linhas_imputadas, colunas_ausentes, colunas_com_nan = plano.transformar(df_bruto)
+    X_final = pd.DataFrame(X, columns=plano.colunas, index=df_bruto.index, copy=False)
+    return X_final, linhas_imputadas, colunas_ausentes, colunas_com_nan
+
+def montar_avisos(colunas_ausentes, colunas_com_nan):
     avisos = []
-    colunas_interesse = colunas_modelo + ['kepoi_name']
-    colunas_presentes = [col for col in colunas_interesse if col in df_processado.columns]
-    df_processado = df_processado[colunas_presentes]
-    colunas_ausentes = set(colunas_modelo) - set(df_processado.columns)
     if colunas_ausentes:
         aviso_cols = f"Colunas ausentes foram preenchidas com valores padrão: {', '.join(sorted(list(colunas_ausentes)))}"
         avisos.append(aviso_cols)
-        for col in colunas_ausentes:
-            df_processado[col] = valores_imputacao.get(col, 0)
-    df_imputacao_check = df_processado[colunas_modelo]
-    colunas_com_nan = df_imputacao_check.columns[df_imputacao_check.isnull().any()].tolist()
     if colunas_com_nan:
         aviso_nan = f"Células vazias foram preenchidas com valores padrão nas colunas: {', '.join(sorted(colunas_com_nan))}"
         avisos.append(aviso_nan)
-        df_processado.fillna(valores_imputacao, inplace=True)
-    if avisos:
-        df_processado['Status_Dados'] = 'Imputado'
-    else:
-        df_processado['Status_Dados'] = 'Completo'
+    if not avisos:
         avisos.append("Análise perfeita: todos os dados estavam completos e no formato esperado.")
-    X_final = df_processado[colunas_modelo]
-    predicoes_numericas = modelo.predict(X_final)
-    scores_confianca = modelo.predict_proba(X_final)
-    shap_values = explainer.shap_values(X_final)
-    mapeamento_predicao = {0: 'FALSO POSITIVO', 1: 'CONFIRMADO'}
-    df_processado['Predicao'] = [mapeamento_predicao[p] for p in predicoes_numericas]
-    df_processado['Score_Confianca'] = (scores_confianca.max(axis=1) * 100).round(2).astype(str) + '%'
-    colunas_resultado = ['kepoi_name', 'Predicao', 'Score_Confianca', 'Status_Dados', 'koi_depth', 'koi_duration', 'koi_prad', 'koi_teq', 'koi_period']
-    colunas_finais_presentes = [col for col in colunas_resultado if col in df_processado.columns]
-    df_resultado = df_processado[colunas_finais_presentes]
-    return df_resultado, avisos, shap_values, X_final, explainer
\ No newline at end of file
+    return avisos
+
+def _montar_resultado(df_bruto, X_final, linhas_imputadas, limiar_decisao, registro, motor, originais=None):
+    if len(X_final) == 0:
+        # Bloco vazio (ex.: arquivo só com cabeçalho): a floresta não aceita zero linhas.
+        predicoes_numericas, confianca = np.empty(0, dtype=np.intp), np.empty(0)
+    else:
+        predicoes_numericas, confianca = prever_com_confianca(X_final, limiar_decisao, registro, motor)
+    return _formatar_resultado(df_bruto, X_final, linhas_imputadas, predicoes_numericas, confianca, originais)
+
+def _formatar_resultado(df_bruto, X_final, linhas_imputadas, predicoes_numericas, confianca, originais=None):
+    # `originais` substitui colunas de X_final (ex.: valores em float64 quando X_final é float32).
+    with estagio('formatacao', len(X_final)):
+        calculadas = {
+            'Predicao': pd.Categorical.from_codes(predicoes_numericas, categories=ROTULOS_PREDICAO),
+            'Score_Confianca': (confianca * 100).round(2),
+            'Status_Dados': pd.Categorical.from_codes(linhas_imputadas.astype(np.int8), categories=STATUS_DADOS),
+            **(originais or {}),
+        }
+        colunas = {}
+        for col in COLUNAS_RESULTADO:
+            if col in calculadas:
+                colunas[col] = calculadas[col]
+            elif col in X_final.columns:
+                colunas[col] = X_final[col]
+            elif col in df_bruto.columns:
+                colunas[col] = df_bruto[col]
+        # copy=False: as colunas de X_final e do arquivo enviado são compartilhadas, não duplicadas.
+        return pd.DataFrame(colunas, index=X_final.index, copy=False)
+
+def processar_e_prever(df_bruto: pd.DataFrame, limiar_decisao=LIMIAR_DECISAO, registro=None, motor=MOTOR_PADRAO):
+    registro = registro or obter_registro()
+    # Forma compacta para a sessão do app: a floresta compara as features em float32,
+    # então as predições e os valores SHAP são os mesmos do plano em float64.
+    X_final, linhas_imputadas, colunas_ausentes, colunas_com_nan = _preparar_dados(df_bruto, registro, registro.plano_colunas_float32)
+    avisos = montar_avisos(colunas_ausentes, colunas_com_nan)
+    # Só a entrada do modelo é float32: as colunas exibidas e exportadas mantêm os valores do arquivo.
+    originais = registro.plano_colunas.transformar_colunas(df_bruto, COLUNAS_RESULTADO)
+    df_resultado = _montar_resultado(df_bruto, X_final, linhas_imputadas, limiar_decisao, registro, motor, originais)
+    df_resultado['Score_Confianca'] = df_resultado['Score_Confianca'].astype(np.float32)
+    explicacoes = ProvedorExplicacoes(X_final, partial(registro.obter, 'explainer'))
+    return df_resultado, avisos, explicacoes
+
+def memoria_resultado(df_resultado, explicacoes):
+    # Bytes do que processar_e_prever devolve; colunas que são visões de X_final contam uma vez só.
+    X_final = explicacoes.X_final
+    compartilhadas = [
+        coluna for coluna in df_resultado.columns
+        if coluna in X_final.columns and np.may_share_memory(df_resultado[coluna].to_numpy(), X_final[coluna].to_numpy())
+    ]
+    return {
+        'resultados': int(df_resultado.drop(columns=compartilhadas).memory_usage(index=False, deep=True).sum()),
+        'explicacoes': explicacoes.nbytes,
+    }
+
+def pontuar_com_features(bloco, limiar_decisao=LIMIAR_DECISAO, registro=None, motor=MOTOR_PADRAO):
+    # Como pontuar_bloco, mas devolve também X_final (as features já imputadas que a floresta recebeu).
+    registro = registro or obter_registro()
+    X_final, linhas_imputadas, colunas_ausentes, colunas_com_nan = _preparar_dados(bloco, registro)
+    df_resultado = _montar_resultado(bloco, X_final, linhas_imputadas, limiar_decisao, registro, motor)
+    return df_resultado, X_final, colunas_ausentes, colunas_com_nan
+
+def pontuar_bloco(bloco, limiar_decisao=LIMIAR_DECISAO, registro=None, motor=MOTOR_PADRAO):
+    # Pontua um bloco sem preparar explicações; devolve também as colunas imputadas para agregar avisos.
+    df_resultado, _, colunas_ausentes, colunas_com_nan = pontuar_com_features(bloco, limiar_decisao, registro, motor)
+    return df_resultado, colunas_ausentes, colunas_com_nan
+
+def explicar_bloco(bloco, limiar_decisao=LIMIAR_DECISAO, registro=None, motor=MOTOR_PADRAO):
+    # Como pontuar_bloco, mas também devolve X_final e os valores SHAP da classe positiva de todas as linhas.
+    registro = registro or obter_registro()
+    df_resultado, X_final, colunas_ausentes, colunas_com_nan = pontuar_com_features(bloco, limiar_decisao, registro, motor)
+    if len(X_final) == 0:
+        valores_shap = np.empty((0, X_final.shape[1]))
+    else:
+        valores_shap = np.asarray(registro.explainer.shap_values(X_final))[:, :, 1]
+    return df_resultado, X_final, valores_shap, colunas_ausentes, colunas_com_nan
+
+def ler_em_blocos(origem, tamanho_bloco=TAMANHO_BLOCO_STREAMING, registro=None, formato=None):
+    # CSV, Parquet ou Feather/Arrow (pela extensão), lendo só as colunas que o modelo usa.
+    registro = registro or obter_registro()
+    return ler_tabela_em_blocos(origem, registro.colunas_modelo, tamanho_bloco, formato or formato_do_arquivo(origem))
+
+def processar_em_blocos(origem, funcao, escritor, tamanho_bloco=TAMANHO_BLOCO_STREAMING, registro=None, mapear=map):
+    # Lê o arquivo em blocos de tamanho fixo e grava o resultado de `funcao(bloco)` em `escritor`
+    # assim que fica pronto: a memória não depende do tamanho do arquivo. `funcao` devolve
+    # (df, colunas_ausentes, colunas_com_nan), como pontuar_bloco; `mapear` pode distribuir os
+    # blocos entre processos, desde que devolva os resultados na ordem das linhas.
+    # Status_Dados é decidido por linha; os avisos consideram o arquivo inteiro.
+    registro = registro or obter_registro()
+    colunas_ausentes = set(registro.colunas_modelo)
+    colunas_com_nan = set()
+    n_linhas = 0
+    with ler_em_blocos(origem, tamanho_bloco, registro) as leitor:
+        for df_resultado, ausentes, com_nan in mapear(funcao, leitor):
+            escritor.escrever(df_resultado)
+            colunas_ausentes &= ausentes
+            colunas_com_nan |= com_nan
+            n_linhas += len(df_resultado)
+    if n_linhas == 0:
+        colunas_ausentes = set()
+    return n_linhas, montar_avisos(colunas_ausentes, colunas_com_nan)
@@ -0,0 +1,137 @@
+# Pontuação em lote, sem interface: divide as linhas de um ou mais arquivos KOI
+# (CSV, Parquet ou Feather/Arrow) entre processos que carregam o modelo uma
+# única vez cada.
+# Uso:
+#     python pontuar_lote.py entregas/*.csv --saida resultados --formato parquet --processos 8
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from artefatos import obter_registro
+from pipeline import LIMIAR_DECISAO, TAMANHO_BLOCO_STREAMING, pontuar_bloco, processar_em_blocos
+
+FORMATOS = ('csv', 'parquet')
+
+
+def _inicializar_trabalhador():
+    obter_registro().carregar_essenciais()
+
+
+class EscritorCSV:
+    def __init__(self, caminho):
+        self._arquivo = open(caminho, 'w', newline='')
+        self._cabecalho = True
+
+    def escrever(self, df):
+        df.to_csv(self._arquivo, header=self._cabecalho, index=False)
+        self._cabecalho = False
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+class EscritorParquet:
+    def __init__(self, caminho):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("O formato parquet requer o pacote 'pyarrow' (pip install pyarrow).")
+        self._pa, self._pq = pa, pq
+        self._caminho = caminho
+        self._escritor = None
+
+    def escrever(self, df):
+        tabela = self._pa.Table.from_pandas(df, preserve_index=False)
+        if self._escritor is None:
+            self._escritor = self._pq.ParquetWriter(self._caminho, tabela.schema)
+        self._escritor.write_table(tabela.cast(self._escritor.schema))
+
+    def fechar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+
+
+def resultados_em_ordem(executor, janela, funcao, blocos):
+    # Como map(funcao, blocos), mas com os blocos divididos entre os processos do executor.
+    # Mantém no máximo `janela` blocos em voo, para que a memória não cresça com o arquivo,
+    # e devolve os resultados na ordem original das linhas.
+    pendentes = deque()
+    for bloco in blocos:
+        pendentes.append(executor.submit(funcao, bloco))
+        if len(pendentes) >= janela:
+            yield pendentes.popleft().result()
+    while pendentes:
+        yield pendentes.popleft().result()
+
+
+def _mapeador(executor, janela):
+    return map if executor is None else partial(resultados_em_ordem, executor, janela)
+
+
+def _abrir_escritor(destino, formato):
+    return EscritorParquet(destino) if formato == 'parquet' else EscritorCSV(destino)
+
+
+def adicionar_argumentos(parser, formato_padrao, tamanho_bloco_padrao):
+    # Argumentos comuns aos CLIs que processam arquivos KOI em blocos.
+    parser.add_argument('entradas', nargs='+', help="Arquivos CSV, Parquet ou Feather/Arrow no formato da tabela KOI da NASA.")
+    parser.add_argument('--saida', help="Diretório dos arquivos gerados (padrão: o diretório de cada entrada).")
+    parser.add_argument('--formato', choices=FORMATOS, default=formato_padrao)
+    parser.add_argument('--processos', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--tamanho-bloco', type=int, default=tamanho_bloco_padrao)
+    parser.add_argument('--limiar', type=float, default=LIMIAR_DECISAO)
+
+
+def executar(args, funcao, sufixo, inicializar_trabalhador):
+    # Processa cada entrada com `funcao` por bloco, grava em '<nome>_<sufixo>.<formato>'
+    # e mostra a vazão de cada arquivo e do total.
+    if args.saida:
+        os.makedirs(args.saida, exist_ok=True)
+    executor = None
+    if args.processos > 1:
+        executor = ProcessPoolExecutor(args.processos, initializer=inicializar_trabalhador)
+    else:
+        inicializar_trabalhador()
+
+    total_linhas = 0
+    inicio_total = time.perf_counter()
+    try:
+        for origem in args.entradas:
+            nome = os.path.splitext(os.path.basename(origem))[0]
+            destino = os.path.join(args.saida or os.path.dirname(origem), f"{nome}_{sufixo}.{args.formato}")
+            inicio = time.perf_counter()
+            try:
+                escritor = _abrir_escritor(destino, args.formato)
+            except ImportError as erro:
+                sys.exit(str(erro))
+            try:
+                n_linhas, avisos = processar_em_blocos(origem, funcao, escritor, args.tamanho_bloco,
+                                                       mapear=_mapeador(executor, 2 * args.processos))
+            finally:
+                escritor.fechar()
+            duracao = time.perf_counter() - inicio
+            total_linhas += n_linhas
+            print(f"{origem} -> {destino}: {n_linhas} linhas em {duracao:.2f} s ({n_linhas / max(duracao, 1e-9):,.0f} linhas/s)")
+            for aviso in avisos:
+                print(f"  {aviso}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    duracao_total = time.perf_counter() - inicio_total
+    print(f"Total: {total_linhas} linhas em {duracao_total:.2f} s ({total_linhas / max(duracao_total, 1e-9):,.0f} linhas/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classifica arquivos de KOIs sem a interface Streamlit.")
+    adicionar_argumentos(parser, 'csv', TAMANHO_BLOCO_STREAMING)
+    args = parser.parse_args(argv)
+    executar(args, partial(pontuar_bloco, limiar_decisao=args.limiar), 'predicoes', _inicializar_trabalhador)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,27 +1,36 @@
 # preparar_artefatos.py
+# Uso: python preparar_artefatos.py [--forcar] [--processos N]
+# Estágios cujas entradas não mudaram desde a última execução são pulados.
+# Depois de atualizar_artefatos.py, o re-treino completo (que descarta as atualizações)
+# só acontece com --forcar.
+import argparse
+import hashlib
+import os
+import sys
 import pandas as pd
+import numpy as np
+from joblib import Parallel, delayed
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import cross_val_score, cross_val_predict
-from sklearn.metrics import roc_curve, confusion_matrix, auc
+from sklearn.model_selection import StratifiedKFold
+from sklearn.metrics import roc_curve, confusion_matrix, auc, accuracy_score
 import matplotlib.pyplot as plt
 import seaborn as sns
 import joblib
 import json
 import shap
-import pickle
 
-print("Iniciando a preparação dos artefatos do modelo...")
+from motor_floresta import FlorestaCompilada
 
-# 1. Carregar os dados
-print("Carregando o dataset original 'dados.csv'...")
-df = pd.read_csv('dados.csv')
+ARQUIVO_DADOS = 'dados.csv'
+DIRETORIO_CACHE = '.cache_artefatos'
+ARQUIVO_ESTAGIOS = os.path.join(DIRETORIO_CACHE, 'estagios.json')
+PARAMETROS_MODELO = {'random_state': 42}
+# Escrito por selecionar_modelo.py --aplicar; sem ele, vale PARAMETROS_MODELO.
+ARQUIVO_PARAMETROS = 'parametros_modelo.json'
+N_FOLDS = 5
+ARQUIVO_CONTAGENS = 'contagens_imputacao.json'
 
-# 2. Pré-processamento
-print("Aplicando pré-processamento dos dados...")
-if 3008 in df.index:
-    df = df.drop(3008, axis=0)
-
-colunas_para_remover = [
+COLUNAS_PARA_REMOVER = [
     "kepid", "kepler_name", "koi_vet_stat", "koi_vet_date", "koi_pdisposition", "koi_score", "koi_disp_prov",
     "koi_comment", "koi_time0bk", "koi_time0bk_err1", "koi_time0bk_err2", "koi_srho", "koi_srho_err1", "koi_srho_err2",
     "koi_fittype", "koi_sma", "koi_limbdark_mod", "koi_parm_prov", "koi_max_sngle_ev", "koi_max_mult_ev", "koi_count",
@@ -33,52 +42,233 @@ colunas_para_remover = [
     "koi_dicco_mdec", "koi_dicco_mdec_err", "koi_dicco_msky", "koi_dicco_msky_err", "koi_dikco_mra", "koi_dikco_mra_err",
     "koi_dikco_mdec", "koi_dikco_mdec_err", "koi_dikco_msky", "koi_dikco_msky_err", "koi_eccen", "koi_ldm_coeff4", "koi_ldm_coeff3"
 ]
-df = df.dropna(axis=1, how="all")
-df = df.drop(columns=colunas_para_remover, errors='ignore')
-
-# Lógica de filtragem robusta
-df_treino = df[df['koi_disposition'].isin(['CONFIRMED', 'FALSE POSITIVE'])].copy()
-mapeamento = {'FALSE POSITIVE': 0, 'CONFIRMED': 1}
-df_treino['koi_disposition'] = df_treino['koi_disposition'].map(mapeamento)
-
-X_treino = df_treino.drop(columns=["koi_disposition", "kepoi_name"])
-y_treino = df_treino["koi_disposition"]
-
-# 3. Salvar artefatos de imputação e colunas
-print("Calculando e salvando valores de imputação e ordem das colunas...")
-valores_imputacao = X_treino.mean().to_dict()
-with open('valores_imputacao.json', 'w') as f:
-    json.dump(valores_imputacao, f, indent=4)
-colunas_modelo = X_treino.columns.tolist()
-with open('colunas_modelo.json', 'w') as f:
-    json.dump(colunas_modelo, f)
-X_treino.fillna(valores_imputacao, inplace=True)
-
-# 4. Treinar o modelo RandomForest final
-print("Treinando o modelo Random Forest final...")
-modelo_rf = RandomForestClassifier(random_state=42)
-modelo_rf.fit(X_treino, y_treino)
-print("Salvando o modelo em 'modelo_random_forest.pkl'...")
-joblib.dump(modelo_rf, 'modelo_random_forest.pkl')
-
-# 5. Criar e salvar o explicador SHAP compatível
-print("Criando e salvando o explicador SHAP...")
-explainer = shap.TreeExplainer(modelo_rf)
-with open('shap_explainer.pkl', 'wb') as f:
-    pickle.dump(explainer, f)
-
-# 6. Gerar e salvar as métricas de performance
-print("Calculando métricas de performance...")
-y_pred_cv = cross_val_predict(modelo_rf, X_treino, y_treino, cv=5)
-y_scores_cv = cross_val_predict(modelo_rf, X_treino, y_treino, cv=5, method="predict_proba")[:, 1]
-
-# Matriz de Confusão e Curva ROC
-cm = confusion_matrix(y_treino, y_pred_cv)
-plt.figure(figsize=(8, 6)); sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=['False Positive', 'Confirmed'], yticklabels=['False Positive', 'Confirmed']); plt.title('Confusion Matrix'); plt.ylabel('True Class'); plt.xlabel('Predicted Class'); plt.savefig('matriz_confusao.png'); plt.close()
-fpr, tpr, _ = roc_curve(y_treino, y_scores_cv); roc_auc = auc(fpr, tpr); plt.figure(figsize=(8, 6)); plt.plot(fpr, tpr, color='darkorange', lw=2, label=f'ROC Curve (Area = {roc_auc:0.3f})'); plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--'); plt.xlabel('False Positive Rate'); plt.ylabel('True Positive Rate'); plt.title('ROC Curve'); plt.legend(loc="lower right"); plt.savefig('curva_roc.png'); plt.close()
-# Acurácia
-acuracia_cv = cross_val_score(modelo_rf, X_treino, y_treino, cv=5, scoring="accuracy").mean()
-print(f"\nAcurácia (Validação Cruzada): {acuracia_cv*100:.1f}%")
-print(f"AUC (ROC): {roc_auc:.3f}")
-
-print("\nArtefatos preparados com sucesso!")
\ No newline at end of file
+
+
+def hash_arquivo(caminho):
+    hash_conteudo = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for parte in iter(lambda: f.read(1 << 20), b''):
+            hash_conteudo.update(parte)
+    return hash_conteudo.hexdigest()
+
+
+def hash_entradas(*partes):
+    return hashlib.sha256(json.dumps(partes, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def carregar_dados(caminho=ARQUIVO_DADOS):
+    # O CSV original é lido uma vez e guardado em formato colunar (parquet, se o
+    # pyarrow estiver instalado); as próximas execuções leem o cache.
+    hash_dados = hash_arquivo(caminho)
+    os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+    try:
+        import pyarrow  # noqa: F401
+        extensao, ler, gravar = 'parquet', pd.read_parquet, pd.DataFrame.to_parquet
+    except ImportError:
+        extensao, ler, gravar = 'pkl', pd.read_pickle, pd.DataFrame.to_pickle
+    caminho_cache = os.path.join(DIRETORIO_CACHE, f"dados_{hash_dados[:16]}.{extensao}")
+    if os.path.exists(caminho_cache):
+        return ler(caminho_cache), hash_dados
+    for antigo in os.listdir(DIRETORIO_CACHE):
+        if antigo.startswith('dados_'):
+            os.remove(os.path.join(DIRETORIO_CACHE, antigo))
+    df = pd.read_csv(caminho)
+    gravar(df, caminho_cache)
+    return df, hash_dados
+
+
+def preprocessar(df):
+    if 3008 in df.index:
+        df = df.drop(3008, axis=0)
+    df = df.dropna(axis=1, how="all")
+    df = df.drop(columns=COLUNAS_PARA_REMOVER, errors='ignore')
+
+    # Lógica de filtragem robusta
+    df_treino = df[df['koi_disposition'].isin(['CONFIRMED', 'FALSE POSITIVE'])].copy()
+    mapeamento = {'FALSE POSITIVE': 0, 'CONFIRMED': 1}
+    df_treino['koi_disposition'] = df_treino['koi_disposition'].map(mapeamento)
+
+    X_treino = df_treino.drop(columns=["koi_disposition", "kepoi_name"])
+    y_treino = df_treino["koi_disposition"]
+    return X_treino, y_treino
+
+
+def carregar_parametros_modelo():
+    if not os.path.exists(ARQUIVO_PARAMETROS):
+        return dict(PARAMETROS_MODELO)
+    with open(ARQUIVO_PARAMETROS, 'r') as f:
+        return {**PARAMETROS_MODELO, **json.load(f)}
+
+
+def _ajustar_fold(X, y, treino, teste, parametros):
+    modelo = RandomForestClassifier(**parametros)
+    modelo.fit(X.iloc[treino], y.iloc[treino])
+    return teste, modelo.predict_proba(X.iloc[teste]), modelo.classes_
+
+
+def validacao_cruzada(X, y, parametros=PARAMETROS_MODELO, n_jobs=-1):
+    # Cada fold é ajustado uma única vez, em paralelo. Rótulos, ROC/AUC e acurácia
+    # saem das mesmas probabilidades fora-da-amostra; os folds são os mesmos do
+    # cv=5 do scikit-learn (StratifiedKFold sem embaralhar).
+    folds = StratifiedKFold(n_splits=N_FOLDS).split(X, y)
+    resultados = Parallel(n_jobs=n_jobs)(delayed(_ajustar_fold)(X, y, treino, teste, parametros) for treino, teste in folds)
+    probabilidades = np.empty((len(y), 2))
+    y_pred = np.empty(len(y), dtype=y.dtype)
+    acuracias = []
+    for teste, proba, classes in resultados:
+        probabilidades[teste] = proba
+        y_pred[teste] = classes[proba.argmax(axis=1)]
+        acuracias.append(accuracy_score(y.iloc[teste], y_pred[teste]))
+    return y_pred, probabilidades[:, 1], float(np.mean(acuracias))
+
+
+class Estagios:
+    """Guarda o hash das entradas e das saídas de cada estágio para pular o que não mudou.
+
+    Uma saída alterada por fora (ex.: por atualizar_artefatos.py) faz o estágio rodar de novo.
+    """
+
+    def __init__(self, forcar=False):
+        self.forcar = forcar
+        self.hashes = {}
+        if os.path.exists(ARQUIVO_ESTAGIOS):
+            with open(ARQUIVO_ESTAGIOS, 'r') as f:
+                self.hashes = json.load(f)
+
+    def atualizado(self, nome, hash_entrada, saidas):
+        registro = self.hashes.get(nome)
+        # Registros no formato antigo (só o hash da entrada) não têm as saídas: o estágio roda de novo.
+        if self.forcar or not isinstance(registro, dict) or registro.get('entrada') != hash_entrada:
+            return False
+        hashes_saidas = registro.get('saidas', {})
+        return all(os.path.exists(saida) and hashes_saidas.get(saida) == hash_arquivo(saida) for saida in saidas)
+
+    def concluir(self, nome, hash_entrada, saidas):
+        self.hashes[nome] = {'entrada': hash_entrada, 'saidas': {saida: hash_arquivo(saida) for saida in saidas}}
+        os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+        with open(ARQUIVO_ESTAGIOS, 'w') as f:
+            json.dump(self.hashes, f, indent=4)
+
+
+def atualizacoes_incrementais(caminho='metricas_modelo.json'):
+    # Atualizações de atualizar_artefatos.py desde o último treino completo, que as métricas registram.
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, 'r') as f:
+        return json.load(f).get('atualizacoes', [])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Treina o modelo e gera os artefatos usados pelo app.")
+    parser.add_argument('--forcar', action='store_true', help="Refaz todos os estágios, mesmo sem mudanças nas entradas (e descarta atualizações incrementais).")
+    parser.add_argument('--processos', type=int, default=-1, help="Processos para treino e validação cruzada (-1 usa todos os núcleos).")
+    args = parser.parse_args(argv)
+    atualizacoes = atualizacoes_incrementais()
+    if atualizacoes and not args.forcar:
+        sys.exit(f"Os artefatos receberam {len(atualizacoes)} atualização(ões) de 'atualizar_artefatos.py' (a última em {atualizacoes[-1]['data']}). "
+                 f"Um novo treino a partir de '{ARQUIVO_DADOS}' descartaria as árvores e as médias de imputação atualizadas; "
+                 "use --forcar para re-treinar mesmo assim.")
+    estagios = Estagios(forcar=args.forcar)
+
+    print("Iniciando a preparação dos artefatos do modelo...")
+
+    # 1. Carregar os dados
+    print(f"Carregando o dataset original '{ARQUIVO_DADOS}'...")
+    df, hash_dados = carregar_dados()
+
+    # 2. Pré-processamento
+    print("Aplicando pré-processamento dos dados...")
+    X_treino, y_treino = preprocessar(df)
+
+    # 3. Salvar artefatos de imputação e colunas
+    hash_imputacao = hash_entradas(hash_dados, COLUNAS_PARA_REMOVER)
+    saidas_imputacao = ['valores_imputacao.json', 'colunas_modelo.json', ARQUIVO_CONTAGENS]
+    if estagios.atualizado('imputacao', hash_imputacao, saidas_imputacao):
+        print("Valores de imputação e ordem das colunas já estão atualizados.")
+        with open('valores_imputacao.json', 'r') as f:
+            valores_imputacao = json.load(f)
+    else:
+        print("Calculando e salvando valores de imputação e ordem das colunas...")
+        valores_imputacao = X_treino.mean().to_dict()
+        with open('valores_imputacao.json', 'w') as f:
+            json.dump(valores_imputacao, f, indent=4)
+        # Quantos valores entraram em cada média: permite atualizá-las depois sem reler os dados (atualizar_artefatos.py).
+        with open(ARQUIVO_CONTAGENS, 'w') as f:
+            json.dump({col: int(n) for col, n in X_treino.count().items()}, f, indent=4)
+        colunas_modelo = X_treino.columns.tolist()
+        with open('colunas_modelo.json', 'w') as f:
+            json.dump(colunas_modelo, f)
+        estagios.concluir('imputacao', hash_imputacao, saidas_imputacao)
+    X_treino.fillna(valores_imputacao, inplace=True)
+
+    # 4. Treinar o modelo RandomForest final
+    parametros_modelo = carregar_parametros_modelo()
+    hash_modelo = hash_entradas(hash_imputacao, parametros_modelo)
+    modelo_rf = None
+    if estagios.atualizado('modelo', hash_modelo, ['modelo_random_forest.pkl']):
+        print("Modelo já está atualizado.")
+    else:
+        print("Treinando o modelo Random Forest final...")
+        modelo_rf = RandomForestClassifier(**parametros_modelo, n_jobs=args.processos)
+        modelo_rf.fit(X_treino, y_treino)
+        # A predição do app roda em um único processo, na ordem das árvores.
+        modelo_rf.set_params(n_jobs=None)
+        print("Salvando o modelo em 'modelo_random_forest.pkl'...")
+        joblib.dump(modelo_rf, 'modelo_random_forest.pkl')
+        estagios.concluir('modelo', hash_modelo, ['modelo_random_forest.pkl'])
+
+    # 5. Criar e salvar o explicador SHAP compatível
+    # Gravado pelo joblib, sem compressão, para que o registro possa mapear os vetores em memória.
+    hash_explicador = hash_entradas(hash_modelo, 'joblib')
+    if estagios.atualizado('explicador', hash_explicador, ['shap_explainer.pkl']):
+        print("Explicador SHAP já está atualizado.")
+    else:
+        print("Criando e salvando o explicador SHAP...")
+        if modelo_rf is None:
+            modelo_rf = joblib.load('modelo_random_forest.pkl')
+        explainer = shap.TreeExplainer(modelo_rf)
+        joblib.dump(explainer, 'shap_explainer.pkl')
+        estagios.concluir('explicador', hash_explicador, ['shap_explainer.pkl'])
+
+    # 6. Exportar a floresta no formato compilado, mapeável em memória pelos workers
+    saidas_compilado = [os.path.join('modelo_compilado', 'manifesto.json')]
+    if estagios.atualizado('modelo_compilado', hash_modelo, saidas_compilado):
+        print("Modelo compilado já está atualizado.")
+    else:
+        print("Exportando o modelo compilado para 'modelo_compilado/'...")
+        if modelo_rf is None:
+            modelo_rf = joblib.load('modelo_random_forest.pkl')
+        with open('colunas_modelo.json', 'r') as f:
+            colunas_modelo = json.load(f)
+        FlorestaCompilada.compilar(modelo_rf).salvar('modelo_compilado', colunas_modelo, hash_arquivo('modelo_random_forest.pkl'))
+        estagios.concluir('modelo_compilado', hash_modelo, saidas_compilado)
+
+    # 7. Gerar e salvar as métricas de performance
+    hash_metricas = hash_entradas(hash_modelo, N_FOLDS)
+    saidas_metricas = ['matriz_confusao.png', 'curva_roc.png', 'metricas_modelo.json']
+    if estagios.atualizado('metricas', hash_metricas, saidas_metricas):
+        print("Métricas de performance já estão atualizadas.")
+        with open('metricas_modelo.json', 'r') as f:
+            metricas = json.load(f)
+    else:
+        print("Calculando métricas de performance...")
+        y_pred_cv, y_scores_cv, acuracia_cv = validacao_cruzada(X_treino, y_treino, parametros_modelo, n_jobs=args.processos)
+
+        # Matriz de Confusão e Curva ROC
+        cm = confusion_matrix(y_treino, y_pred_cv)
+        plt.figure(figsize=(8, 6)); sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=['False Positive', 'Confirmed'], yticklabels=['False Positive', 'Confirmed']); plt.title('Confusion Matrix'); plt.ylabel('True Class'); plt.xlabel('Predicted Class'); plt.savefig('matriz_confusao.png'); plt.close()
+        fpr, tpr, _ = roc_curve(y_treino, y_scores_cv); roc_auc = auc(fpr, tpr); plt.figure(figsize=(8, 6)); plt.plot(fpr, tpr, color='darkorange', lw=2, label=f'ROC Curve (Area = {roc_auc:0.3f})'); plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--'); plt.xlabel('False Positive Rate'); plt.ylabel('True Positive Rate'); plt.title('ROC Curve'); plt.legend(loc="lower right"); plt.savefig('curva_roc.png'); plt.close()
+        metricas = {'acuracia_cv': acuracia_cv, 'auc_roc': float(roc_auc)}
+        with open('metricas_modelo.json', 'w') as f:
+            json.dump(metricas, f, indent=4)
+        estagios.concluir('metricas', hash_metricas, saidas_metricas)
+
+    # Acurácia
+    print(f"\nAcurácia (Validação Cruzada): {metricas['acuracia_cv']*100:.1f}%")
+    print(f"AUC (ROC): {metricas['auc_roc']:.3f}")
+
+    print("\nArtefatos preparados com sucesso!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import numpy as np
+
+
+class PlanoColunas:
+    """Plano de pré-processamento compilado uma vez a partir dos artefatos.
+
+    `transformar` monta a matriz de atributos (C-contígua, na ordem de
+    `colunas_modelo`) em uma única passada: cada coluna presente é copiada
+    direto para a matriz, colunas ausentes recebem o valor de imputação e as
+    células vazias são preenchidas com uma máscara NumPy, sem copiar o
+    DataFrame de entrada.
+    """
+
+    def __init__(self, colunas_modelo, valores_imputacao, dtype=np.float64):
+        self.colunas = list(colunas_modelo)
+        self.dtype = np.dtype(dtype)
+        self.posicoes = {coluna: j for j, coluna in enumerate(self.colunas)}
+        self.valores_imputacao = np.array([valores_imputacao.get(coluna, 0) for coluna in self.colunas], dtype=self.dtype)
+
+    def transformar_colunas(self, df, colunas):
+        # Só algumas colunas do plano, imputadas como em `transformar`: {coluna: vetor}.
+        resultado = {}
+        for coluna in colunas:
+            j = self.posicoes.get(coluna)
+            if j is None or coluna in resultado:
+                continue
+            if coluna in df.columns:
+                valores = df.iloc[:, df.columns.get_indexer_for([coluna])[0]].to_numpy(dtype=self.dtype, na_value=np.nan, copy=True)
+                valores[np.isnan(valores)] = self.valores_imputacao[j]
+            else:
+                valores = np.full(len(df), self.valores_imputacao[j], dtype=self.dtype)
+            resultado[coluna] = valores
+        return resultado
+
+    def transformar(self, df):
+        # Devolve (X, linhas_imputadas, colunas_ausentes, colunas_com_nan).
+        X = np.empty((len(df), len(self.colunas)), dtype=self.dtype)
+        presentes = np.zeros(len(self.colunas), dtype=bool)
+        for coluna in df.columns:
+            j = self.posicoes.get(coluna)
+            if j is not None and not presentes[j]:
+                X[:, j] = df[coluna].to_numpy(dtype=self.dtype, na_value=np.nan)
+                presentes[j] = True
+        X[:, ~presentes] = self.valores_imputacao[~presentes]
+
+        nulos = np.isnan(X)
+        np.copyto(X, self.valores_imputacao, where=nulos)
+        linhas_imputadas = nulos.any(axis=1)
+        colunas_nulas = nulos.any(axis=0)
+        if not presentes.all():
+            linhas_imputadas[:] = True
+
+        colunas_ausentes = {coluna for coluna, presente in zip(self.colunas, presentes) if not presente}
+        colunas_com_nan = {coluna for coluna, nula in zip(self.colunas, colunas_nulas) if nula}
+        return X, linhas_imputadas, colunas_ausentes, colunas_com_nan
@@ -0,0 +1,110 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import matplotlib.pyplot as plt
+import shap
+
+from narrativa import gerar_narrativa
+
+CAPACIDADE_RENDERIZACOES = 64
+# Quantos KOIs limítrofes pré-renderizar em segundo plano após cada análise (0 desativa).
+PRE_RENDERIZAR = int(os.environ.get('EXOPLANETAS_PRE_RENDERIZAR', 0))
+
+# O pyplot guarda a figura corrente em estado global: uma renderização por vez no processo.
+LOCK_MATPLOTLIB = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def renderizar_force_plot(expected_value, valores_shap_classe_1, features):
+    # PNG com as mesmas opções que st.pyplot usa ao salvar a figura.
+    with LOCK_MATPLOTLIB:
+        figura_inicial = plt.figure(figsize=(20, 5))
+        fig = shap.force_plot(expected_value, valores_shap_classe_1, features, matplotlib=True, show=False, text_rotation=30)
+        try:
+            imagem = BytesIO()
+            fig.savefig(imagem, format='png', dpi=200, bbox_inches='tight')
+        finally:
+            plt.close(fig)
+            plt.close(figura_inicial)
+    return imagem.getvalue()
+
+
+def renderizar_explicacao(explicacoes, predicao, idx, valores_shap=None):
+    # As features da sessão ficam em float32; o texto e a figura usam os valores em float64.
+    features = explicacoes.X_final.iloc[idx, :].astype(float)
+    if valores_shap is None:
+        valores_shap = explicacoes.valores_shap(idx)
+    valores_shap_classe_1 = valores_shap.astype(float)
+    imagem = renderizar_force_plot(explicacoes.valor_base, valores_shap_classe_1, features.round(3))
+    linhas = gerar_narrativa(predicao, features.index, features.to_numpy(), valores_shap_classe_1)
+    return imagem, linhas
+
+
+class CacheRenderizacoes:
+    """LRU das explicações já renderizadas, por (análise, KOI).
+
+    Cada entrada guarda o PNG do force plot e as linhas da narrativa, de modo
+    que voltar a um candidato já visto não refaz nem o SHAP nem a figura.
+    """
+
+    def __init__(self, capacidade=CAPACIDADE_RENDERIZACOES):
+        self.capacidade = capacidade
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def explicacao(self, chave, gerar):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada
+            self.falhas += 1
+        entrada = gerar()
+        self._guardar(chave, entrada)
+        return entrada
+
+    def contem(self, chave):
+        with self._lock:
+            return chave in self._entradas
+
+    def pre_renderizar(self, id_analise, explicacoes, df_resultados, indice_koi, n=PRE_RENDERIZAR):
+        # Renderiza em segundo plano os `n` candidatos mais limítrofes, os mais prováveis de serem abertos.
+        nomes = [nome for nome in indice_koi.mais_limitrofes(min(n, self.capacidade)) if not self.contem((id_analise, nome))]
+        if not nomes:
+            return None
+        thread = threading.Thread(target=self._pre_renderizar, args=(id_analise, explicacoes, df_resultados, indice_koi, nomes), daemon=True)
+        thread.start()
+        return thread
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'entradas': len(self._entradas),
+                'bytes': sum(len(imagem) for imagem, _ in self._entradas.values()),
+            }
+
+    def _pre_renderizar(self, id_analise, explicacoes, df_resultados, indice_koi, nomes):
+        try:
+            posicoes = [indice_koi.posicao(nome) for nome in nomes]
+            valores_shap = explicacoes.valores_shap_lote(posicoes)
+            for nome, idx, valores in zip(nomes, posicoes, valores_shap):
+                predicao = df_resultados['Predicao'].iat[idx]
+                self._guardar((id_analise, nome), renderizar_explicacao(explicacoes, predicao, idx, valores))
+        except Exception:
+            logger.exception("Falha ao pré-renderizar explicações")
+
+    def _guardar(self, chave, entrada):
+        with self._lock:
+            self._entradas[chave] = entrada
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.capacidade:
+                self._entradas.popitem(last=False)
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+ROTULOS_EN = {'FALSO POSITIVO': 'FALSE POSITIVE', 'CONFIRMADO': 'CONFIRMED'}
+# Acima deste número de pontos o gráfico de dispersão passa a usar amostra estratificada ou densidade.
+ORCAMENTO_PONTOS = int(os.environ.get('EXOPLANETAS_ORCAMENTO_PONTOS', 20000))
+BINS_DENSIDADE = 80
+
+
+def amostra_estratificada(classes, orcamento, semente=42):
+    # Posições de uma amostra com a mesma proporção de cada classe; classes raras
+    # mantêm ao menos uma fatia mínima do orçamento para continuarem visíveis.
+    rng = np.random.default_rng(semente)
+    codigos, contagens = np.unique(classes, return_counts=True)
+    minimo = orcamento // (10 * max(len(codigos), 1))
+    selecionadas = []
+    for codigo, contagem in zip(codigos, contagens):
+        quota = min(contagem, max(minimo, int(round(orcamento * contagem / len(classes)))))
+        posicoes = np.flatnonzero(classes == codigo)
+        selecionadas.append(rng.choice(posicoes, quota, replace=False))
+    return np.sort(np.concatenate(selecionadas))
+
+
+class ResumoAnalise:
+    """Agregados do painel calculados uma única vez por análise.
+
+    Guarda as contagens por predição, os pontos que o gráfico de dispersão
+    realmente desenha (todos, ou uma amostra estratificada quando passam de
+    `orcamento_pontos`) e um histograma 2D para o modo de densidade.
+    """
+
+    def __init__(self, df_resultados, orcamento_pontos=ORCAMENTO_PONTOS, bins=BINS_DENSIDADE):
+        predicao = df_resultados['Predicao'].cat.rename_categories(ROTULOS_EN)
+        self.total = len(df_resultados)
+        self.contagens = predicao.value_counts(sort=False)
+        self.orcamento_pontos = orcamento_pontos
+
+        self.amostrado = self.total > orcamento_pontos
+        posicoes = amostra_estratificada(predicao.cat.codes.to_numpy(), orcamento_pontos) if self.amostrado else slice(None)
+        self.pontos = pd.DataFrame({
+            'kepoi_name': df_resultados['kepoi_name'].array[posicoes],
+            'koi_duration': df_resultados['koi_duration'].to_numpy()[posicoes],
+            'koi_depth': df_resultados['koi_depth'].to_numpy()[posicoes],
+            # Categórica, como a predição dos resultados: sem uma string por ponto.
+            'Prediction_EN': predicao.array[posicoes],
+        })
+
+        duracao = df_resultados['koi_duration'].to_numpy(dtype=float)
+        profundidade = df_resultados['koi_depth'].to_numpy(dtype=float)
+        validos = np.isfinite(duracao) & np.isfinite(profundidade)
+        self.densidade, self.bordas_duracao, self.bordas_profundidade = np.histogram2d(duracao[validos], profundidade[validos], bins=bins)
+
+    @property
+    def nbytes(self):
+        return (int(self.pontos.memory_usage(index=False, deep=True).sum()) + int(self.contagens.memory_usage(deep=True))
+                + self.densidade.nbytes + self.bordas_duracao.nbytes + self.bordas_profundidade.nbytes)
+
+    @property
+    def confirmados(self):
+        return int(self.contagens.get('CONFIRMED', 0))
+
+    @property
+    def falsos_positivos(self):
+        return int(self.contagens.get('FALSE POSITIVE', 0))
@@ -0,0 +1,207 @@
+# selecionar_modelo.py
+# Busca de hiperparâmetros da floresta com "successive halving": todas as combinações
+# começam numa amostra pequena dos dados e só as melhores seguem para amostras maiores.
+# Além da AUC da validação cruzada, mede o tamanho e a latência (predição e SHAP por
+# linha) das finalistas e escolhe a menor floresta cuja AUC fica dentro da tolerância
+# da melhor. O relatório vai para selecao_modelo.json e selecao_modelo.png, ao lado de
+# curva_roc.png; com --aplicar, os parâmetros escolhidos vão para parametros_modelo.json
+# e são usados na próxima execução de preparar_artefatos.py.
+# Uso: python selecionar_modelo.py [--tolerancia 0.005] [--processos N] [--aplicar]
+import argparse
+import itertools
+import json
+import math
+import pickle
+import time
+from datetime import datetime, timezone
+
+import matplotlib.pyplot as plt
+import numpy as np
+import shap
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+from motor_floresta import FlorestaCompilada
+from preparar_artefatos import ARQUIVO_PARAMETROS, N_FOLDS, PARAMETROS_MODELO, carregar_dados, carregar_parametros_modelo, preprocessar
+
+GRADE_PARAMETROS = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [None, 6, 12, 24],
+    'min_samples_leaf': [1, 3, 10],
+    'max_features': ['sqrt', 'log2', 0.5],
+}
+FATOR_ELIMINACAO = 3
+MIN_AMOSTRAS = 300
+TOLERANCIA_AUC = 0.005
+LINHAS_LATENCIA = 1000
+LINHAS_SHAP = 100
+ARQUIVO_RELATORIO = 'selecao_modelo.json'
+ARQUIVO_GRAFICO = 'selecao_modelo.png'
+
+
+def candidatos(grade=GRADE_PARAMETROS):
+    nomes = list(grade)
+    return [{**PARAMETROS_MODELO, **dict(zip(nomes, valores))} for valores in itertools.product(*grade.values())]
+
+
+def parametros_atuais(grade=GRADE_PARAMETROS):
+    # Os parâmetros em uso (parametros_modelo.json, se existir), com os padrões do
+    # RandomForestClassifier nas chaves da grade que não foram definidas.
+    padroes = RandomForestClassifier().get_params()
+    return {**{chave: padroes[chave] for chave in grade}, **carregar_parametros_modelo()}
+
+
+def n_nos(modelo):
+    return int(sum(arvore.tree_.node_count for arvore in modelo.estimators_))
+
+
+def _avaliar_fold(X, y, treino, teste, parametros):
+    modelo = RandomForestClassifier(**parametros)
+    modelo.fit(X[treino], y[treino])
+    return roc_auc_score(y[teste], modelo.predict_proba(X[teste])[:, 1]), n_nos(modelo)
+
+
+def avaliar_rodada(X, y, lista_parametros, n_jobs):
+    # Uma tarefa por (combinação, fold): o paralelismo não depende do número de folds.
+    folds = list(StratifiedKFold(n_splits=N_FOLDS).split(X, y))
+    resultados = Parallel(n_jobs=n_jobs)(
+        delayed(_avaliar_fold)(X, y, treino, teste, parametros)
+        for parametros in lista_parametros for treino, teste in folds
+    )
+    avaliacoes = []
+    for i, parametros in enumerate(lista_parametros):
+        aucs, nos = zip(*resultados[i * N_FOLDS:(i + 1) * N_FOLDS])
+        avaliacoes.append({'parametros': parametros, 'auc_cv': float(np.mean(aucs)), 'auc_cv_desvio': float(np.std(aucs)), 'nos': int(np.mean(nos))})
+    return avaliacoes
+
+
+def sobreviventes(avaliacoes, n_manter, tolerancia):
+    # A melhor AUC sempre segue (é a referência da tolerância); depois, as que estão dentro
+    # da tolerância, das menores para as maiores, e só então as demais por AUC.
+    melhor = max(avaliacoes, key=lambda a: a['auc_cv'])
+    aceitaveis = sorted((a for a in avaliacoes if a is not melhor and a['auc_cv'] >= melhor['auc_cv'] - tolerancia), key=lambda a: a['nos'])
+    demais = sorted((a for a in avaliacoes if a is not melhor and a['auc_cv'] < melhor['auc_cv'] - tolerancia), key=lambda a: -a['auc_cv'])
+    return [a['parametros'] for a in [melhor, *aceitaveis, *demais][:n_manter]]
+
+
+def successive_halving(X, y, lista_parametros, tolerancia, n_jobs, fator=FATOR_ELIMINACAO, min_amostras=MIN_AMOSTRAS):
+    n_rodadas = 1 + int(math.log(len(lista_parametros), fator))
+    # Amostras crescem pelo mesmo fator; a última rodada usa todos os dados.
+    n_rodadas = min(n_rodadas, 1 + max(0, int(math.log(len(y) / min_amostras, fator))))
+    rodadas = []
+    for rodada in range(n_rodadas):
+        n_amostras = len(y) if rodada == n_rodadas - 1 else int(len(y) / fator ** (n_rodadas - 1 - rodada))
+        if n_amostras < len(y):
+            indices, _ = train_test_split(np.arange(len(y)), train_size=n_amostras, stratify=y, random_state=rodada)
+        else:
+            indices = np.arange(len(y))
+        inicio = time.perf_counter()
+        avaliacoes = avaliar_rodada(X[indices], y[indices], lista_parametros, n_jobs)
+        rodadas.append({'rodada': rodada, 'amostras': int(n_amostras), 'candidatos': len(lista_parametros),
+                        'tempo_s': time.perf_counter() - inicio, 'avaliacoes': avaliacoes})
+        print(f"Rodada {rodada + 1}/{n_rodadas}: {len(lista_parametros)} combinações em {n_amostras} linhas "
+              f"({rodadas[-1]['tempo_s']:.1f} s), melhor AUC {max(a['auc_cv'] for a in avaliacoes):.4f}")
+        if rodada < n_rodadas - 1:
+            lista_parametros = sobreviventes(avaliacoes, math.ceil(len(lista_parametros) / fator), tolerancia)
+    return rodadas
+
+
+def _melhor_tempo(funcao, repeticoes=3):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def medir_latencia(parametros, X, y):
+    # Treina no conjunto completo e mede num único processo, como o app roda.
+    modelo = RandomForestClassifier(**parametros).fit(X, y)
+    X_lote = X[:LINHAS_LATENCIA]
+    X_linha = X[:1]
+    floresta = FlorestaCompilada.compilar(modelo)
+    explainer = shap.TreeExplainer(modelo)
+    X_shap = X[:LINHAS_SHAP]
+    return {
+        'nos': n_nos(modelo),
+        'tamanho_pickle_bytes': len(pickle.dumps(modelo)),
+        'predict_proba_por_linha_s': _melhor_tempo(lambda: modelo.predict_proba(X_lote)) / len(X_lote),
+        'predict_proba_uma_linha_s': _melhor_tempo(lambda: modelo.predict_proba(X_linha), 10),
+        'compilado_uma_linha_s': _melhor_tempo(lambda: floresta.predict_proba(X_linha), 10),
+        'shap_por_linha_s': _melhor_tempo(lambda: explainer.shap_values(X_shap, check_additivity=False), 1) / len(X_shap),
+    }
+
+
+def escolher(finalistas, tolerancia):
+    melhor_auc = max(f['auc_cv'] for f in finalistas)
+    elegiveis = [f for f in finalistas if f['auc_cv'] >= melhor_auc - tolerancia]
+    return min(elegiveis, key=lambda f: (f['nos'], f['shap_por_linha_s']))
+
+
+def grafico(finalistas, escolhido, referencia, caminho):
+    plt.figure(figsize=(8, 6))
+    plt.scatter([f['shap_por_linha_s'] * 1e3 for f in finalistas], [f['auc_cv'] for f in finalistas], color='steelblue', label='Finalists')
+    plt.scatter([referencia['shap_por_linha_s'] * 1e3], [referencia['auc_cv']], color='gray', marker='s', label='Current parameters')
+    plt.scatter([escolhido['shap_por_linha_s'] * 1e3], [escolhido['auc_cv']], color='darkorange', marker='*', s=200, label='Selected')
+    plt.xscale('log'); plt.xlabel('SHAP latency per row (ms)'); plt.ylabel('CV AUC (ROC)'); plt.title('Model Selection'); plt.legend(loc='lower right')
+    plt.savefig(caminho); plt.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Escolhe os hiperparâmetros da floresta pesando AUC e latência.")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_AUC, help="Perda máxima de AUC aceita para ficar com uma floresta menor.")
+    parser.add_argument('--processos', type=int, default=-1, help="Processos para a busca (-1 usa todos os núcleos).")
+    parser.add_argument('--aplicar', action='store_true', help=f"Grava os parâmetros escolhidos em '{ARQUIVO_PARAMETROS}'.")
+    args = parser.parse_args(argv)
+    inicio = time.perf_counter()
+
+    print("Carregando e pré-processando os dados...")
+    X_treino, y_treino = preprocessar(carregar_dados()[0])
+    X_treino = X_treino.fillna(X_treino.mean())
+    X, y = X_treino.to_numpy(dtype=np.float32), y_treino.to_numpy()
+
+    lista_parametros = candidatos()
+    rodadas = successive_halving(X, y, lista_parametros, args.tolerancia, args.processos)
+
+    print("Medindo tamanho e latência das finalistas...")
+    finalistas = [{**avaliacao, **medir_latencia(avaliacao['parametros'], X, y)} for avaliacao in rodadas[-1]['avaliacoes']]
+    escolhido = escolher(finalistas, args.tolerancia)
+    # Os parâmetros atuais podem ter sido eliminados antes do fim; são medidos à parte para comparação.
+    atuais = parametros_atuais()
+    referencia = next((f for f in finalistas if all(f['parametros'][chave] == atuais[chave] for chave in GRADE_PARAMETROS)), None)
+    if referencia is None:
+        referencia = {**avaliar_rodada(X, y, [atuais], args.processos)[0], **medir_latencia(atuais, X, y)}
+
+    with open(ARQUIVO_RELATORIO, 'w') as f:
+        json.dump({
+            'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'grade': GRADE_PARAMETROS,
+            'fator_eliminacao': FATOR_ELIMINACAO,
+            'tolerancia_auc': args.tolerancia,
+            'escolhido': escolhido,
+            'referencia': referencia,
+            'finalistas': finalistas,
+            'rodadas': rodadas,
+            'tempo_total_s': time.perf_counter() - inicio,
+        }, f, indent=4)
+    grafico(finalistas, escolhido, referencia, ARQUIVO_GRAFICO)
+
+    print(f"\n{'':<12} {'AUC':>7} {'nós':>9} {'pickle (MB)':>12} {'predict (µs/linha)':>19} {'SHAP (ms/linha)':>16}")
+    for nome, f in (('Atual', referencia), ('Escolhido', escolhido)):
+        print(f"{nome:<12} {f['auc_cv']:>7.4f} {f['nos']:>9} {f['tamanho_pickle_bytes'] / 2**20:>12.2f} "
+              f"{f['predict_proba_por_linha_s'] * 1e6:>19.1f} {f['shap_por_linha_s'] * 1e3:>16.2f}")
+    parametros = {chave: valor for chave, valor in escolhido['parametros'].items() if chave != 'random_state'}
+    print(f"\nParâmetros escolhidos: {parametros}")
+    print(f"Relatório gravado em '{ARQUIVO_RELATORIO}' e '{ARQUIVO_GRAFICO}'.")
+
+    if args.aplicar:
+        with open(ARQUIVO_PARAMETROS, 'w') as f:
+            json.dump(escolhido['parametros'], f, indent=4)
+        print(f"Parâmetros gravados em '{ARQUIVO_PARAMETROS}'; execute 'preparar_artefatos.py' para treinar o novo modelo.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+# Serviço HTTP local de classificação, com o mesmo caminho de pontuação de pipeline.py.
+# Requisições simultâneas são agrupadas em micro-lotes antes de passar pela floresta.
+# Uso:
+#     python servico.py --porta 8000 --janela-ms 5
+# Rotas:
+#     POST /predict               um KOI (objeto JSON) ou uma lista de KOIs
+#     GET  /explain/<kepoi_name>  valores SHAP de um KOI pontuado recentemente
+#     GET  /metricas              percentis de latência e tamanho dos micro-lotes
+import argparse
+import json
+import math
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import numpy as np
+import pandas as pd
+
+from artefatos import obter_registro
+from pipeline import LIMIAR_DECISAO, MOTORES, montar_avisos, pontuar_com_features
+
+JANELA_MS = 5
+MAX_LINHAS_LOTE = 1024
+CAPACIDADE_KOIS_RECENTES = 10000
+AMOSTRAS_METRICAS = 10000
+
+
+class Metricas:
+    def __init__(self, amostras=AMOSTRAS_METRICAS):
+        self._latencias_ms = deque(maxlen=amostras)
+        self._tamanhos_lote = deque(maxlen=amostras)
+        self._requisicoes = 0
+        self._lotes = 0
+        self._lock = threading.Lock()
+
+    def registrar_requisicao(self, latencia_s):
+        with self._lock:
+            self._requisicoes += 1
+            self._latencias_ms.append(latencia_s * 1000)
+
+    def registrar_lote(self, n_linhas):
+        with self._lock:
+            self._lotes += 1
+            self._tamanhos_lote.append(n_linhas)
+
+    def resumo(self):
+        with self._lock:
+            latencias = np.asarray(self._latencias_ms)
+            tamanhos = np.asarray(self._tamanhos_lote)
+            resumo = {'requisicoes': self._requisicoes, 'lotes': self._lotes}
+        if len(latencias):
+            p50, p90, p99 = np.percentile(latencias, [50, 90, 99])
+            resumo['latencia_ms'] = {'p50': p50, 'p90': p90, 'p99': p99, 'max': latencias.max()}
+        if len(tamanhos):
+            resumo['tamanho_lote'] = {'media': tamanhos.mean(), 'p50': np.median(tamanhos), 'max': int(tamanhos.max())}
+        return resumo
+
+
+class AgrupadorMicroLotes:
+    """Junta os KOIs de requisições simultâneas e os pontua em uma única chamada.
+
+    O primeiro pedido da fila abre uma janela de `janela_ms`; tudo o que chegar
+    nesse intervalo (até `max_linhas`) entra no mesmo lote.
+    """
+
+    def __init__(self, registro, motor, limiar_decisao=LIMIAR_DECISAO, janela_ms=JANELA_MS, max_linhas=MAX_LINHAS_LOTE, metricas=None):
+        self.registro = registro
+        self.motor = motor
+        self.limiar_decisao = limiar_decisao
+        self.janela_s = janela_ms / 1000
+        self.max_linhas = max_linhas
+        self.metricas = metricas or Metricas()
+        self.kois_recentes = OrderedDict()
+        self._lock_kois = threading.Lock()
+        self._fila = queue.Queue()
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+
+    def pontuar(self, registros):
+        futuro = Future()
+        self._fila.put((registros, futuro))
+        return futuro.result()
+
+    def features_recentes(self, kepoi_name):
+        with self._lock_kois:
+            return self.kois_recentes.get(kepoi_name)
+
+    def _executar(self):
+        while True:
+            pedidos = [self._fila.get()]
+            n_linhas = len(pedidos[0][0])
+            prazo = time.perf_counter() + self.janela_s
+            while n_linhas < self.max_linhas:
+                restante = prazo - time.perf_counter()
+                if restante <= 0:
+                    break
+                try:
+                    pedido = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                pedidos.append(pedido)
+                n_linhas += len(pedido[0])
+            try:
+                self._pontuar_lote(pedidos)
+            except Exception as e:
+                for _, futuro in pedidos:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+
+    def _pontuar_lote(self, pedidos):
+        colunas_modelo = self.registro.colunas_modelo
+        colunas_interesse = colunas_modelo + ['kepoi_name']
+        todos = [registro for registros, _ in pedidos for registro in registros]
+        lote = pd.DataFrame.from_records(todos, columns=colunas_interesse)
+        # Os valores já chegam como float ou nulos (converter_registros); colunas só com nulos viram float aqui.
+        lote[colunas_modelo] = lote[colunas_modelo].astype(np.float64)
+        nulos = lote[colunas_modelo].isna().to_numpy()
+        df_resultado, X_final, _, _ = pontuar_com_features(lote, self.limiar_decisao, self.registro, self.motor)
+        self.metricas.registrar_lote(len(lote))
+
+        # Antes de responder: quem recebe a resposta pode pedir /explain em seguida.
+        with self._lock_kois:
+            for nome, features in zip(lote['kepoi_name'], X_final.to_numpy()):
+                if isinstance(nome, str):
+                    self.kois_recentes[nome] = features
+                    self.kois_recentes.move_to_end(nome)
+            while len(self.kois_recentes) > CAPACIDADE_KOIS_RECENTES:
+                self.kois_recentes.popitem(last=False)
+
+        # Status_Dados já vem por linha; os avisos são calculados por requisição,
+        # como se cada uma fosse um upload separado.
+        inicio = 0
+        for registros, futuro in pedidos:
+            fim = inicio + len(registros)
+            chaves = set().union(*registros) if registros else set()
+            ausentes = set(colunas_modelo) - chaves
+            com_nan = {col for col, tem_nulo in zip(colunas_modelo, nulos[inicio:fim].any(axis=0)) if tem_nulo} - ausentes
+            futuro.set_result((df_resultado.iloc[inicio:fim], montar_avisos(ausentes, com_nan)))
+            inicio = fim
+
+
+def converter_registros(registros, colunas_modelo):
+    # Converte os atributos do modelo para float (nulos continuam nulos e são imputados);
+    # devolve também os pares (índice do KOI, coluna) com valores que não são números.
+    convertidos, invalidos = [], []
+    for i, registro in enumerate(registros):
+        convertido = dict(registro)
+        for coluna in colunas_modelo:
+            valor = registro.get(coluna)
+            if valor is None:
+                continue
+            try:
+                convertido[coluna] = float(valor)
+            except (TypeError, ValueError):
+                invalidos.append((i, coluna))
+        convertidos.append(convertido)
+    return convertidos, invalidos
+
+
+class ServidorHTTP(ThreadingHTTPServer):
+    # A fila padrão do socketserver (5 conexões) derruba rajadas de requisições simultâneas.
+    request_queue_size = 256
+    daemon_threads = True
+
+
+def _serializavel(valor):
+    if isinstance(valor, (np.floating, float)):
+        return None if math.isnan(valor) else float(valor)
+    if isinstance(valor, np.integer):
+        return int(valor)
+    if isinstance(valor, dict):
+        return {chave: _serializavel(v) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_serializavel(v) for v in valor]
+    return valor
+
+
+def criar_manipulador(agrupador):
+    registro = agrupador.registro
+
+    class Manipulador(BaseHTTPRequestHandler):
+        def _responder(self, status, corpo):
+            dados = json.dumps(_serializavel(corpo), ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_POST(self):
+            if self.path.rstrip('/') != '/predict':
+                return self._responder(404, {'erro': 'Rota não encontrada.'})
+            inicio = time.perf_counter()
+            try:
+                tamanho = int(self.headers.get('Content-Length', 0))
+                if tamanho < 0:
+                    raise ValueError(tamanho)
+            except ValueError:
+                return self._responder(400, {'erro': 'Cabeçalho Content-Length inválido.'})
+            try:
+                corpo = json.loads(self.rfile.read(tamanho) or b'null')
+            except ValueError:
+                # JSONDecodeError e UnicodeDecodeError (bytes que não são UTF-8).
+                return self._responder(400, {'erro': 'Corpo da requisição não é um JSON válido.'})
+            registros = [corpo] if isinstance(corpo, dict) else corpo
+            if not isinstance(registros, list) or not registros or not all(isinstance(r, dict) for r in registros):
+                return self._responder(400, {'erro': 'Envie um objeto JSON por KOI ou uma lista de objetos.'})
+            registros, invalidos = converter_registros(registros, registro.colunas_modelo)
+            if invalidos:
+                descricao = ', '.join(f"KOI {i}: {coluna}" for i, coluna in invalidos[:10])
+                return self._responder(400, {'erro': f"Valores não numéricos ({descricao})."})
+            try:
+                resultado, avisos = agrupador.pontuar(registros)
+            except Exception as e:
+                return self._responder(500, {'erro': str(e)})
+            agrupador.metricas.registrar_requisicao(time.perf_counter() - inicio)
+            resultado = resultado.astype({'Predicao': str})
+            self._responder(200, {'resultados': resultado.to_dict(orient='records'), 'avisos': avisos})
+
+        def do_GET(self):
+            if self.path.startswith('/explain/'):
+                return self._explicar(unquote(self.path[len('/explain/'):]))
+            if self.path.rstrip('/') == '/metricas':
+                return self._responder(200, agrupador.metricas.resumo())
+            self._responder(404, {'erro': 'Rota não encontrada.'})
+
+        def _explicar(self, kepoi_name):
+            features = agrupador.features_recentes(kepoi_name)
+            if features is None:
+                return self._responder(404, {'erro': f"KOI '{kepoi_name}' não foi pontuado recentemente; envie-o para /predict antes."})
+            explainer = registro.explainer
+            X = pd.DataFrame([features], columns=registro.colunas_modelo)
+            valores = np.asarray(explainer.shap_values(X))[0, :, 1]
+            self._responder(200, {
+                'kepoi_name': kepoi_name,
+                'expected_value': explainer.expected_value[1],
+                'valores_shap': dict(zip(registro.colunas_modelo, valores)),
+                'valores': dict(zip(registro.colunas_modelo, features)),
+            })
+
+        def log_message(self, formato, *args):
+            pass
+
+    return Manipulador
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP local de classificação de KOIs.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--janela-ms', type=float, default=JANELA_MS)
+    parser.add_argument('--max-lote', type=int, default=MAX_LINHAS_LOTE)
+    parser.add_argument('--limiar', type=float, default=LIMIAR_DECISAO)
+    # Os micro-lotes são pequenos; nessa faixa o motor compilado tem menor latência.
+    parser.add_argument('--motor', choices=MOTORES, default='compilado')
+    args = parser.parse_args(argv)
+
+    registro = obter_registro().carregar_essenciais('floresta_compilada' if args.motor == 'compilado' else 'modelo')
+    agrupador = AgrupadorMicroLotes(registro, args.motor, args.limiar, args.janela_ms, args.max_lote)
+    servidor = ServidorHTTP((args.host, args.porta), criar_manipulador(agrupador))
+    print(f"Servindo em http://{args.host}:{args.porta} (janela de {args.janela_ms} ms, motor {args.motor})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
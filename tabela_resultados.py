@@ -0,0 +1,50 @@
+from io import BytesIO
+
+import numpy as np
+
+TAMANHOS_PAGINA = (25, 50, 100, 250)
+TAMANHO_BLOCO_EXPORTACAO = 50000
+
+
+def filtrar_resultados(df_resultados, predicoes=None, confianca_minima=0.0, confianca_maxima=100.0, busca_nome=''):
+    # Devolve as posições (iloc) das linhas que passam nos filtros, sem copiar o DataFrame.
+    mascara = df_resultados['Score_Confianca'].between(confianca_minima, confianca_maxima).to_numpy()
+    if predicoes is not None:
+        mascara = mascara & df_resultados['Predicao'].isin(predicoes).to_numpy()
+    if busca_nome:
+        nomes = df_resultados['kepoi_name'].astype(str).str
+        mascara = mascara & nomes.contains(busca_nome, case=False, regex=False).to_numpy()
+    return np.flatnonzero(mascara)
+
+
+def ordenar_posicoes(df_resultados, posicoes, coluna, crescente=True):
+    # Ordenação estável só das posições filtradas; NaN sempre no fim.
+    valores = df_resultados[coluna].iloc[posicoes].reset_index(drop=True)
+    ordem = valores.sort_values(ascending=crescente, kind='stable', na_position='last').index.to_numpy()
+    return posicoes[ordem]
+
+
+def numero_de_paginas(n_linhas, tamanho_pagina):
+    return max(1, -(-n_linhas // tamanho_pagina))
+
+
+def pagina_resultados(df_resultados, posicoes, numero_pagina, tamanho_pagina):
+    # Só as linhas da página são materializadas e enviadas ao navegador.
+    inicio = (numero_pagina - 1) * tamanho_pagina
+    return df_resultados.iloc[posicoes[inicio:inicio + tamanho_pagina]]
+
+
+def exportar_csv(df_resultados, tamanho_bloco=TAMANHO_BLOCO_EXPORTACAO):
+    # Escreve em blocos para não montar uma string com o arquivo inteiro.
+    destino = BytesIO()
+    for inicio in range(0, max(len(df_resultados), 1), tamanho_bloco):
+        df_resultados.iloc[inicio:inicio + tamanho_bloco].to_csv(destino, header=inicio == 0, index=False)
+    destino.seek(0)
+    return destino
+
+
+def exportar_parquet(df_resultados):
+    destino = BytesIO()
+    df_resultados.to_parquet(destino, index=False)
+    destino.seek(0)
+    return destino
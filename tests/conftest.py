@@ -0,0 +1,29 @@
+# Os testes usam os artefatos versionados na raiz do projeto (modelo, colunas e
+# valores de imputação). O explicador SHAP não é versionado: é criado aqui.
+# Uso, a partir da raiz do projeto: python -m pytest tests
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from artefatos import obter_registro  # noqa: E402
+from benchmarks.gerador_koi import gerar_kois  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def registro():
+    return obter_registro()
+
+
+@pytest.fixture(scope='session')
+def explainer(registro):
+    import shap
+    return shap.TreeExplainer(registro.modelo)
+
+
+@pytest.fixture(scope='session')
+def kois(registro):
+    # Uma coluna do modelo ausente, células vazias e colunas que o modelo ignora, como nos arquivos reais.
+    return gerar_kois(300, registro.colunas_modelo, registro.valores_imputacao, 0.02, 0.05, colunas_extras=3)
@@ -0,0 +1,51 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from explicacoes import ProvedorExplicacoes
+from pipeline import processar_e_prever
+
+
+@pytest.fixture(scope='module')
+def X_final(registro, kois):
+    _, _, explicacoes = processar_e_prever(kois.head(40), registro=registro)
+    return explicacoes.X_final
+
+
+def _sem_explainer():
+    raise AssertionError("o explicador não deveria ser carregado")
+
+
+def test_valores_iguais_ao_explainer(X_final, explainer):
+    provedor = ProvedorExplicacoes(X_final, lambda: explainer)
+    esperado = np.asarray(explainer.shap_values(X_final.iloc[:8]))[:, :, 1].astype(np.float32)
+    np.testing.assert_array_equal(provedor.valores_shap_lote(range(8)), esperado)
+    np.testing.assert_array_equal(provedor.valores_shap(3), esperado[3])
+    assert provedor.valor_base == explainer.expected_value[1]
+
+
+def test_cache_lru(X_final, explainer):
+    provedor = ProvedorExplicacoes(X_final, lambda: explainer, capacidade=4)
+    provedor.valores_shap_lote([0, 1, 2, 3])
+    provedor.valores_shap(0)
+    provedor.valores_shap(4)
+    assert list(provedor._cache) == [2, 3, 0, 4]
+    # Linhas em cache não voltam ao explicador.
+    provedor._carregar_explainer = _sem_explainer
+    provedor.valores_shap_lote([2, 3, 0, 4])
+
+
+def test_pickle_preserva_cache(X_final, explainer):
+    provedor = ProvedorExplicacoes(X_final, lambda: explainer)
+    esperado = provedor.valores_shap_lote([5, 6])
+    copia = pickle.loads(pickle.dumps(provedor))
+    assert copia.X_final.equals(X_final)
+    copia._carregar_explainer = _sem_explainer
+    np.testing.assert_array_equal(copia.valores_shap_lote([5, 6]), esperado)
+
+
+def test_aquecer_preenche_os_indices(X_final, explainer):
+    provedor = ProvedorExplicacoes(X_final, lambda: explainer)
+    provedor.aquecer([7, 1, 9], tamanho_lote=2).join()
+    assert sorted(provedor._cache) == [1, 7, 9]
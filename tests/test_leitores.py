@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from leitores import ler_tabela, ler_tabela_em_blocos
+from pipeline import processar_e_prever
+
+
+@pytest.fixture(scope='module')
+def arquivos(kois, tmp_path_factory):
+    diretorio = tmp_path_factory.mktemp('kois')
+    caminhos = {formato: str(diretorio / f"kois.{formato}") for formato in ('csv', 'parquet', 'feather')}
+    kois.to_csv(caminhos['csv'], index=False)
+    kois.to_parquet(caminhos['parquet'])
+    kois.to_feather(caminhos['feather'])
+    return caminhos
+
+
+def _esperado(df, colunas_modelo):
+    # O pyarrow lê os floats do CSV com arredondamento exato; o parser padrão do pandas pode errar o último dígito.
+    return df[[col for col in ['kepoi_name'] + colunas_modelo if col in df.columns]]
+
+
+@pytest.mark.parametrize('formato', ['csv', 'parquet', 'feather'])
+def test_ler_tabela_igual_ao_original(registro, kois, arquivos, formato):
+    df = ler_tabela(arquivos[formato], registro.colunas_modelo, formato)
+    esperado = _esperado(kois, registro.colunas_modelo)
+    assert list(df.columns) == list(esperado.columns)
+    np.testing.assert_array_equal(df.drop(columns='kepoi_name').to_numpy(), esperado.drop(columns='kepoi_name').to_numpy())
+    assert (df['kepoi_name'].astype(str) == esperado['kepoi_name']).all()
+
+
+@pytest.mark.parametrize('formato', ['csv', 'parquet', 'feather'])
+def test_blocos_iguais_a_tabela_inteira(registro, arquivos, formato):
+    inteira = ler_tabela(arquivos[formato], registro.colunas_modelo, formato)
+    with ler_tabela_em_blocos(arquivos[formato], registro.colunas_modelo, 70, formato) as blocos:
+        partes = list(blocos)
+    assert max(len(parte) for parte in partes) == 70
+    pd.testing.assert_frame_equal(pd.concat(partes), inteira)
+
+
+def test_csv_sem_colunas_do_modelo(registro, tmp_path):
+    caminho = tmp_path / 'outro.csv'
+    pd.DataFrame({'a': [1, 2, 3], 'b': [4, 5, 6]}).to_csv(caminho, index=False)
+    assert len(ler_tabela(str(caminho), registro.colunas_modelo)) == 3
+    with ler_tabela_em_blocos(str(caminho), registro.colunas_modelo, 2) as blocos:
+        assert sum(len(bloco) for bloco in blocos) == 3
+
+
+def test_valor_nao_numerico_no_meio_do_csv(registro, kois, tmp_path):
+    caminho = tmp_path / 'invalido.csv'
+    df = kois.copy()
+    coluna = registro.colunas_modelo[-1]
+    df[coluna] = df[coluna].astype(object)
+    df.loc[len(df) - 5, coluna] = 'n/d'
+    df.to_csv(caminho, index=False)
+    esperado = pd.read_csv(caminho, usecols=lambda col: col in ['kepoi_name'] + registro.colunas_modelo)
+    inteira = ler_tabela(str(caminho), registro.colunas_modelo)
+    assert len(inteira) == len(esperado)
+    with ler_tabela_em_blocos(str(caminho), registro.colunas_modelo, 100) as blocos:
+        partes = list(blocos)
+    assert sum(len(parte) for parte in partes) == len(esperado)
+    assert pd.concat(partes).index.equals(pd.RangeIndex(len(esperado)))
+
+
+def test_predicoes_iguais_com_pd_read_csv(registro, arquivos):
+    df_leitor, _, _ = processar_e_prever(ler_tabela(arquivos['csv'], registro.colunas_modelo), registro=registro)
+    df_pandas, _, _ = processar_e_prever(pd.read_csv(arquivos['csv'], float_precision='round_trip'), registro=registro)
+    assert (df_leitor['Predicao'].astype(str) == df_pandas['Predicao'].astype(str)).all()
+    np.testing.assert_array_equal(df_leitor['Score_Confianca'], df_pandas['Score_Confianca'])
+    assert (df_leitor['Status_Dados'].astype(str) == df_pandas['Status_Dados'].astype(str)).all()
@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pytest
+
+from motor_floresta import FlorestaCompilada, gerar_linhas
+from pipeline import prever_com_confianca, processar_e_prever
+
+
+@pytest.fixture(scope='module')
+def floresta(registro):
+    return FlorestaCompilada.compilar(registro.modelo)
+
+
+@pytest.fixture(scope='module')
+def X_final(registro, kois):
+    _, _, explicacoes = processar_e_prever(kois, registro=registro)
+    return explicacoes.X_final
+
+
+def test_probabilidades_iguais_ao_sklearn(registro, floresta, X_final):
+    np.testing.assert_array_equal(floresta.predict_proba(X_final.to_numpy()), registro.modelo.predict_proba(X_final))
+
+
+def test_probabilidades_iguais_com_nulos(registro, floresta):
+    X = gerar_linhas(floresta, len(registro.colunas_modelo), 500, fracao_nulos=0.2)
+    np.testing.assert_array_equal(floresta.predict_proba(X), registro.modelo.predict_proba(X))
+
+
+def test_motores_equivalentes(registro, X_final):
+    classes_sklearn, confianca_sklearn = prever_com_confianca(X_final, registro=registro, motor='sklearn')
+    classes_compilado, confianca_compilado = prever_com_confianca(X_final, registro=registro, motor='compilado')
+    np.testing.assert_array_equal(classes_compilado, classes_sklearn)
+    np.testing.assert_array_equal(confianca_compilado, confianca_sklearn)
+
+
+def test_salvar_e_carregar(registro, floresta, X_final, tmp_path):
+    floresta.salvar(tmp_path, registro.colunas_modelo)
+    carregada = FlorestaCompilada.carregar(tmp_path, registro.colunas_modelo)
+    np.testing.assert_array_equal(carregada.predict_proba(X_final.to_numpy()), floresta.predict_proba(X_final.to_numpy()))
+
+
+def test_carregar_recusa_pacote_corrompido(registro, floresta, tmp_path):
+    floresta.salvar(tmp_path, registro.colunas_modelo)
+    arquivo = os.path.join(tmp_path, 'limiar.npy')
+    with open(arquivo, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        ultimo = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([ultimo[0] ^ 0x01]))
+    with pytest.raises(RuntimeError):
+        FlorestaCompilada.carregar(tmp_path, registro.colunas_modelo)
+    with pytest.raises(RuntimeError):
+        FlorestaCompilada.carregar(tmp_path, list(reversed(registro.colunas_modelo)))
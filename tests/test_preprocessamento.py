@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from pipeline import processar_e_prever
+
+
+def _caminho_anterior(df, colunas_modelo, valores_imputacao):
+    # Seleção e imputação como eram feitas antes do PlanoColunas.
+    X = df.reindex(columns=colunas_modelo)
+    for coluna in set(colunas_modelo) - set(df.columns):
+        X[coluna] = valores_imputacao.get(coluna, 0)
+    return X.fillna(valores_imputacao).astype(np.float64)
+
+
+def test_plano_igual_ao_caminho_anterior(registro, kois):
+    X, linhas_imputadas, ausentes, com_nan = registro.plano_colunas.transformar(kois)
+    esperado = _caminho_anterior(kois, registro.colunas_modelo, registro.valores_imputacao)
+    np.testing.assert_array_equal(X, esperado.to_numpy())
+    assert ausentes == set(registro.colunas_modelo) - set(kois.columns)
+    assert com_nan == {coluna for coluna in kois.columns if coluna in registro.colunas_modelo and kois[coluna].isna().any()}
+    assert linhas_imputadas.all()
+
+
+def test_status_por_linha_sem_colunas_ausentes(registro):
+    completas = pd.DataFrame({coluna: [1.0, 2.0, 3.0] for coluna in registro.colunas_modelo})
+    completas.iloc[1, 0] = np.nan
+    df_resultado, avisos, _ = processar_e_prever(completas, registro=registro)
+    assert df_resultado['Status_Dados'].astype(str).tolist() == ['Completo', 'Imputado', 'Completo']
+    assert avisos == [f"Células vazias foram preenchidas com valores padrão nas colunas: {registro.colunas_modelo[0]}"]
+
+
+def test_resultado_igual_ao_modelo_em_float64(registro, kois):
+    df_resultado, _, _ = processar_e_prever(kois, registro=registro)
+    esperado = _caminho_anterior(kois, registro.colunas_modelo, registro.valores_imputacao)
+    probabilidades = registro.modelo.predict_proba(esperado)
+    classes = (probabilidades[:, 1] > 0.5).astype(int)
+    assert (df_resultado['Predicao'].cat.codes.to_numpy() == classes).all()
+    np.testing.assert_array_equal(df_resultado['Score_Confianca'], (probabilidades[np.arange(len(classes)), classes] * 100).round(2).astype(np.float32))
+    # As colunas exibidas e exportadas mantêm os valores em float64.
+    for coluna in ('koi_depth', 'koi_duration', 'koi_prad', 'koi_teq', 'koi_period'):
+        np.testing.assert_array_equal(df_resultado[coluna], esperado[coluna])